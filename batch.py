@@ -0,0 +1,167 @@
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from timeit import default_timer as timer
+import board_cache
+import route_solver
+
+
+# Solves many hands from a file without any prompts, e.g.
+#   python3 batch.py hands.csv results.jsonl --workers 4
+# Hands are read from CSV (columns entry_cards and town_cards, each a space
+# separated list of numbers, and an optional id column) or JSONL (one object
+# per line with the same keys, as lists). Results are written as soon as
+# each hand is solved, as JSONL or CSV depending on the output file name.
+# The board is read from the board cache created by run.py
+
+
+# Loaded once in each worker process, as a route_solver.Board. The cached
+# arrays are memory-mapped, so every worker shares the same copy
+board = None
+
+
+def init_worker(cache_dir):
+    global board
+    board = board_cache.solver_board(board_cache.load_board_cache(cache_dir))
+
+
+# Lines which cannot be read are passed on with an error, like hands with
+# bad cards, so one bad line does not stop the rest being solved. Exits if
+# a CSV file does not have the card columns at all
+def read_hands(path):
+    with open(path, "r", newline="") as file:
+        if path.endswith(".jsonl"):
+            for number, line in enumerate(file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    hand = json.loads(line)
+                except ValueError:
+                    yield {"id": number, "error": "Line is not valid JSON."}
+                    continue
+                if not isinstance(hand, dict):
+                    yield {"id": number,
+                           "error": "Line must be a JSON object."}
+                    continue
+                hand.setdefault("id", number)
+                yield hand
+        else:
+            reader = csv.DictReader(file)
+            missing = {"entry_cards", "town_cards"} - set(
+                reader.fieldnames or [])
+            if missing:
+                sys.exit(f"{path} has no {' or '.join(sorted(missing))}"
+                         f" column.")
+            for number, row in enumerate(reader, start=1):
+                yield {
+                    "id": row.get("id") or number,
+                    "entry_cards": (row["entry_cards"] or "").split(),
+                    "town_cards": (row["town_cards"] or "").split(),
+                }
+
+
+# Run in a worker process. With profile, the time taken by each phase and
+# the work done (see route_solver.SolveProfile) are included in the result
+def solve_hand(hand, method, time_limit, profile=False):
+    start = timer()
+    result = {"id": hand["id"]}
+    if "error" in hand:
+        result["error"] = hand["error"]
+        return result
+    try:
+        entry_pair = [int(card) for card in hand["entry_cards"]]
+        town_cards = [int(card) for card in hand["town_cards"]]
+    except (KeyError, TypeError, ValueError):
+        result["error"] = "Cards must be lists of integers."
+        return result
+    result["entry_cards"] = entry_pair
+    result["town_cards"] = town_cards
+
+    solve_profile = route_solver.SolveProfile()
+    try:
+        solution = board.solve(entry_pair, town_cards, method=method,
+                               time_limit=time_limit, profile=solve_profile)
+    except ValueError as e:
+        result["error"] = str(e)
+        return result
+    result["length"] = int(solution.length)
+    result["proven_optimal"] = solution.proven_optimal
+    result["routes"] = solution.to_dict()["routes"]
+    result["towns_visited"] = solution.towns_visited
+    result["time"] = round(timer() - start, 5)
+    if profile:
+        result["profile"] = solve_profile.to_dict()
+    return result
+
+
+CSV_COLUMNS = ["id", "entry_cards", "town_cards", "length",
+               "proven_optimal", "routes", "towns_visited", "time", "profile",
+               "error"]
+
+
+# Writes each result as soon as it is given, so progress is never lost
+def write_results(path, results):
+    with open(path, "w", newline="") as file:
+        if path.endswith(".csv"):
+            writer = csv.DictWriter(file, fieldnames=CSV_COLUMNS)
+            writer.writeheader()
+        count = 0
+        for result in results:
+            if path.endswith(".csv"):
+                writer.writerow({key: json.dumps(value)
+                                 if isinstance(value, (list, dict)) else value
+                                 for key, value in result.items()})
+            else:
+                file.write(json.dumps(result) + "\n")
+            file.flush()
+            count += 1
+    return count
+
+
+def solve_hands(hands, method="held-karp", time_limit=None, workers=1,
+                cache_dir=board_cache.BOARD_CACHE_DIR, profile=False):
+    arguments = (hands, itertools.repeat(method),
+                 itertools.repeat(time_limit), itertools.repeat(profile))
+    if workers <= 1:
+        init_worker(cache_dir)
+        yield from map(solve_hand, *arguments)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(cache_dir,)) as executor:
+        yield from executor.map(solve_hand, *arguments, chunksize=16)
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(
+        description="Solve many Discovering Ireland hands from a file.")
+    parser.add_argument("hands", help="input file (.csv or .jsonl)")
+    parser.add_argument("results", help="output file (.jsonl or .csv)")
+    parser.add_argument("--method", default="held-karp",
+                        choices=sorted(route_solver.SOLVERS))
+    parser.add_argument("--time-limit", type=float, default=None,
+                        help="seconds per hand, for anytime solvers")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="number of processes solving hands")
+    parser.add_argument("--board-cache", default=board_cache.BOARD_CACHE_DIR,
+                        help="directory of the board cache")
+    parser.add_argument("--profile", action="store_true",
+                        help="include time taken by each phase of solving")
+    arguments = parser.parse_args(arguments)
+
+    if board_cache.load_board_cache(arguments.board_cache) is None:
+        sys.exit(f"No board cache found in '{arguments.board_cache}'. "
+                 f"Run run.py once to create it.")
+
+    start = timer()
+    count = write_results(arguments.results, solve_hands(
+        read_hands(arguments.hands), arguments.method, arguments.time_limit,
+        arguments.workers, arguments.board_cache, arguments.profile))
+    print(f"Solved {count} hands in {round(timer() - start, 5)} seconds")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from timeit import default_timer as timer
+import numpy as np
+import board_cache
+import route_solver
+import route_storage
+from synthetic_board import NUMBER_OF_TOWNS, synthetic_edge_weights
+
+
+# Times the solvers, shortest path precomputation, route expansion, board
+# cache and route storage, e.g.
+#   python3 benchmark.py --output before.json
+#   python3 benchmark.py --output after.json --compare before.json
+# Hands are generated from a fixed seed, so every run times the same hands.
+# The board is read from the board cache if there is one, otherwise a
+# synthetic board of the same size is generated (also from the seed)
+
+
+def benchmark_board(seed, cache_dir):
+    board = board_cache.load_board_cache(cache_dir)
+    if board is not None:
+        return np.asarray(board["edge_weights_matrix"]), board["town_names"], \
+            "cache"
+    town_names = [f"Town{card}" for card in range(1, NUMBER_OF_TOWNS + 1)]
+    return synthetic_edge_weights(seed), town_names, "synthetic"
+
+
+# Same hands for the same seed, number of Town Cards and number of hands
+def generate_hands(board, number_of_towns, count, seed):
+    rng = random.Random(f"{seed}-{number_of_towns}")
+    return [(rng.choices(board.entry_cards, k=2),
+             rng.sample(board.town_cards, number_of_towns))
+            for _ in range(count)]
+
+
+# Timings (seconds) summarised for the results file
+def summary(name, times, **parameters):
+    return {
+        "name": name,
+        "parameters": parameters,
+        "runs": len(times),
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.fmean(times),
+    }
+
+
+def time_calls(function, repeats):
+    times = []
+    for _ in range(repeats):
+        start = timer()
+        function()
+        times.append(timer() - start)
+    return times
+
+
+# Fake Google Sheet for timing SheetsStorage without a network. latency
+# (seconds) is added to every request
+class FakeSpreadsheet:
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.worksheets = {}
+
+    def add_worksheet(self, title, rows, cols):
+        time.sleep(self.latency)
+        self.worksheets[title] = FakeWorksheet(self, title)
+        return self.worksheets[title]
+
+    def values_get(self, range_name):
+        time.sleep(self.latency)
+        title = range_name.strip("'")
+        return {"values": self.worksheets[title].values}
+
+
+class FakeWorksheet:
+
+    def __init__(self, spreadsheet, title):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.values = []
+
+    def update(self, range_name, values):
+        time.sleep(self.spreadsheet.latency)
+        self.values = values
+
+
+def benchmark_shortest_paths(edge_weights_matrix, repeats):
+    times = time_calls(
+        lambda: route_solver.all_pairs_shortest_paths(edge_weights_matrix),
+        repeats)
+    return [summary("all_pairs_shortest_paths", times,
+                    towns=len(edge_weights_matrix))]
+
+
+def benchmark_solvers(board, methods, max_towns, hands, seed):
+    results = []
+    for method in methods:
+        limit = route_solver.SOLVER_CARD_LIMITS[method]
+        if max_towns is not None:
+            limit = min(limit, max_towns)
+        for number_of_towns in range(3, limit + 1):
+            times = []
+            for entry_pair, town_cards in generate_hands(
+                    board, number_of_towns, hands, seed):
+                start = timer()
+                route_solver.find_optimal_routes(
+                    board.distances, entry_pair, town_cards, method=method)
+                times.append(timer() - start)
+            results.append(summary("solve", times, method=method,
+                                   town_cards=number_of_towns))
+            print(f"  {method} {number_of_towns} Town Cards: "
+                  f"{statistics.median(times):.5f}s", file=sys.stderr)
+    return results
+
+
+def benchmark_expansion(board, max_towns, hands, seed):
+    results = []
+    limit = route_solver.SOLVER_CARD_LIMITS["held-karp"]
+    if max_towns is not None:
+        limit = min(limit, max_towns)
+    for number_of_towns in range(3, limit + 1):
+        solved = [(entry_pair, route_solver.find_optimal_routes(
+                      board.distances, entry_pair, town_cards)[1])
+                  for entry_pair, town_cards in generate_hands(
+                      board, number_of_towns, hands, seed)]
+        times = []
+        for entry_pair, routes in solved:
+            start = timer()
+            towns_visited = board.expand_routes(routes)
+            towns_visited = route_solver.remove_duplicate_routes(
+                towns_visited)
+            route_solver.remove_symmetrical_routes(towns_visited, entry_pair)
+            times.append(timer() - start)
+        results.append(summary("expand_routes", times,
+                               town_cards=number_of_towns))
+    return results
+
+
+def benchmark_board_cache(edge_weights_matrix, town_names, repeats):
+    distances, predecessors = route_solver.all_pairs_shortest_paths(
+        edge_weights_matrix)
+    board = {
+        "source_hash": "benchmark",
+        "edge_weights_matrix": edge_weights_matrix,
+        "distances": distances,
+        "predecessors": predecessors,
+        "town_names": town_names,
+    }
+    with tempfile.TemporaryDirectory() as cache_dir:
+        save_times = time_calls(
+            lambda: board_cache.save_board_cache(board, cache_dir), repeats)
+        load_times = time_calls(
+            lambda: board_cache.load_board_cache(cache_dir), repeats)
+    return [summary("save_board_cache", save_times),
+            summary("load_board_cache", load_times)]
+
+
+def benchmark_storage(board, repeats, latency, seed):
+    entry_pair, town_cards = generate_hands(board, 8, 1, seed)[0]
+    dealt_hand = entry_pair + town_cards
+    results_list = [[str(town) for town in route] for route in
+                    route_solver.expand_routes(
+                        board.predecessors, route_solver.find_optimal_routes(
+                            board.distances, entry_pair, town_cards)[1])]
+
+    backends = {"sqlite": route_storage.SQLiteStorage(":memory:")}
+    try:
+        import gspread  # noqa: F401 (needed by SheetsStorage)
+    except ImportError:
+        print("  gspread not installed, skipping sheets storage",
+              file=sys.stderr)
+    else:
+        spreadsheet = FakeSpreadsheet(latency)
+        backends["sheets"] = route_storage.SheetsStorage(lambda: spreadsheet)
+
+    results = []
+    for backend, storage in backends.items():
+        names = iter(range(repeats))
+        save_times = time_calls(lambda: storage.save(
+            f"benchmark{next(names)}", dealt_hand, results_list), repeats)
+        names = iter(range(repeats))
+        load_times = time_calls(
+            lambda: storage.load(f"benchmark{next(names)}"), repeats)
+        results.append(summary("save_routes", save_times, backend=backend,
+                               latency=latency if backend == "sheets" else 0))
+        results.append(summary("load_routes", load_times, backend=backend,
+                               latency=latency if backend == "sheets" else 0))
+    return results
+
+
+# Prints how each median changed since an earlier results file
+def compare(results, previous_path):
+    with open(previous_path, "r") as file:
+        previous = {json.dumps([result["name"], result["parameters"]],
+                               sort_keys=True): result
+                    for result in json.load(file)["results"]}
+    for result in results:
+        key = json.dumps([result["name"], result["parameters"]],
+                         sort_keys=True)
+        if key in previous and previous[key]["median"] > 0:
+            ratio = result["median"] / previous[key]["median"]
+            parameters = ", ".join(f"{name}={value}" for name, value in
+                                   result["parameters"].items())
+            print(f"{result['name']}({parameters}): {ratio:.2f}x")
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the Discovering Ireland route solver.")
+    parser.add_argument("--output", default="benchmark.json",
+                        help="JSON file to write results to")
+    parser.add_argument("--compare", help="earlier results to compare with")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--hands", type=int, default=5,
+                        help="hands timed for each number of Town Cards")
+    parser.add_argument("--repeats", type=int, default=5,
+                        help="times each other benchmark is repeated")
+    parser.add_argument("--max-towns", type=int, default=None,
+                        help="largest hand (default: each solver's limit)")
+    parser.add_argument("--methods", nargs="+",
+                        default=sorted(route_solver.SOLVERS),
+                        choices=sorted(route_solver.SOLVERS))
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="seconds added to each fake Sheets request")
+    parser.add_argument("--board-cache", default=board_cache.BOARD_CACHE_DIR,
+                        help="directory of the board cache")
+    arguments = parser.parse_args(arguments)
+
+    edge_weights_matrix, town_names, board_source = benchmark_board(
+        arguments.seed, arguments.board_cache)
+    board = route_solver.Board.from_edge_weights(edge_weights_matrix,
+                                                 town_names)
+
+    results = benchmark_shortest_paths(edge_weights_matrix,
+                                       arguments.repeats)
+    results += benchmark_board_cache(edge_weights_matrix, town_names,
+                                     arguments.repeats)
+    results += benchmark_solvers(board, arguments.methods,
+                                 arguments.max_towns, arguments.hands,
+                                 arguments.seed)
+    results += benchmark_expansion(board, arguments.max_towns,
+                                   arguments.hands, arguments.seed)
+    results += benchmark_storage(board, arguments.repeats, arguments.latency,
+                                 arguments.seed)
+
+    with open(arguments.output, "w") as file:
+        json.dump({
+            "seed": arguments.seed,
+            "board": board_source,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "results": results,
+        }, file, indent=2)
+    print(f"Wrote {len(results)} results to {arguments.output}")
+
+    if arguments.compare is not None:
+        compare(results, arguments.compare)
+
+
+if __name__ == "__main__":
+    main()
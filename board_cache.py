@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+import numpy as np
+import route_solver
+
+
+# Directory holding the cached board, one .npy file per array so that each
+# can be memory-mapped when loaded
+BOARD_CACHE_DIR = "board_cache"
+
+# Arrays stored in the cache
+BOARD_ARRAYS = ["edge_weights_matrix", "distances", "predecessors",
+                "town_names"]
+
+# Written last, so a cache is only used once every array has been saved
+SOURCE_HASH_FILE = "source_hash.txt"
+
+
+# Hash of the raw values read from the counted_distances and town_names
+# worksheets. The cache is only rebuilt when this changes
+def source_hash(counted_distances, town_names):
+    source = json.dumps([counted_distances, town_names])
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+# Returns the cached board as a dictionary of read-only memory-mapped arrays
+# along with its source_hash, or None if there is no complete cache
+def load_board_cache(cache_dir=BOARD_CACHE_DIR):
+    try:
+        with open(os.path.join(cache_dir, SOURCE_HASH_FILE), "r") as file:
+            board = {"source_hash": file.read().strip()}
+        for name in BOARD_ARRAYS:
+            board[name] = np.load(os.path.join(cache_dir, f"{name}.npy"),
+                                  mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+    board["town_names"] = [str(town) for town in board["town_names"]]
+    return board
+
+
+def save_board_cache(board, cache_dir=BOARD_CACHE_DIR):
+    os.makedirs(cache_dir, exist_ok=True)
+    hash_path = os.path.join(cache_dir, SOURCE_HASH_FILE)
+
+    # Remove the old hash first, so a partly written cache is never used
+    if os.path.exists(hash_path):
+        os.remove(hash_path)
+    for name in BOARD_ARRAYS:
+        np.save(os.path.join(cache_dir, f"{name}.npy"),
+                np.asarray(board[name]))
+    with open(hash_path, "w") as file:
+        file.write(board["source_hash"])
+
+
+# Reads the board from the Google Sheet (get_sheet returns the spreadsheet)
+# and precomputes all shortest paths, unless the cached copy can be used.
+# With refresh, the sheet is always read, but the cache is only rebuilt if
+# the sheet content has changed. Returns a route_solver.Board and where it
+# was read from ("cache" or "Google Sheets")
+def load_board(get_sheet, refresh=False, cache_dir=BOARD_CACHE_DIR):
+    board = load_board_cache(cache_dir)
+    if board is not None and not refresh:
+        return solver_board(board), "cache"
+
+    # Extracting data from counted_distances worksheet
+    sheet = get_sheet()
+    distance_data = sheet.worksheet("counted_distances")
+    counted_distances = distance_data.get_all_values()
+
+    # Extracting town names from town_names, convert to list of strings
+    town_data = sheet.worksheet("town_names")
+    town_names = town_data.get_all_values()
+    town_names = [town[0] for town in town_names]
+
+    # Cached copy is still valid if the sheet content has not changed
+    new_hash = source_hash(counted_distances, town_names)
+    if board is not None and board["source_hash"] == new_hash:
+        return solver_board(board), "Google Sheets"
+
+    # Convert values from counted_distances to a NumPy array of integers
+    edge_weights_matrix = np.array(counted_distances, dtype=np.int32)
+
+    # Distance of the shortest path between every pair of towns, and the
+    # predecessor matrix used to rebuild the towns visited along each path
+    distances, predecessors = route_solver.all_pairs_shortest_paths(
+        edge_weights_matrix)
+
+    board = {
+        "source_hash": new_hash,
+        "edge_weights_matrix": edge_weights_matrix,
+        "distances": distances,
+        "predecessors": predecessors,
+        "town_names": town_names,
+    }
+    save_board_cache(board, cache_dir)
+    return solver_board(board), "Google Sheets"
+
+
+# Builds a route_solver.Board from the arrays of a cached board
+def solver_board(board, entry_cards=route_solver.ENTRY_CARDS):
+    return route_solver.Board(board["distances"], board["predecessors"],
+                              board["town_names"], entry_cards,
+                              source_hash=board["source_hash"])
@@ -0,0 +1,989 @@
+import contextlib
+import heapq
+import itertools
+import math
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from timeit import default_timer as timer
+
+
+# Placeholder length for states that have not (yet) been reached.
+# Kept well below the int32 maximum so adding a distance cannot overflow
+UNREACHABLE = np.iinfo(np.int32).max // 2
+
+
+# Records how long each phase of solving a hand takes (phases, in seconds)
+# and how much work was done (counters, e.g. orderings scored or tied
+# optimal routes found, and peaks, e.g. bytes of the largest arrays held at
+# once). Pass one to Board.solve or find_optimal_routes as profile.
+# on_phase(name, seconds) and on_count(name, value) are called as each
+# timing and counter is recorded, so they can be logged as they happen.
+# Solvers which know how far through their search they are call
+# on_progress(fraction) as they go, with fraction from 0 to 1
+class SolveProfile:
+
+    def __init__(self, on_phase=None, on_count=None, on_progress=None):
+        self.on_phase = on_phase
+        self.on_count = on_count
+        self.on_progress = on_progress
+        self.phases = {}
+        self.counters = {}
+        self.peaks = {}
+
+    # Times the code inside a with block, adding to any earlier time
+    # recorded for the same phase
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = timer()
+        try:
+            yield
+        finally:
+            self.add_time(name, timer() - start)
+
+    def add_time(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0) + seconds
+        if self.on_phase is not None:
+            self.on_phase(name, seconds)
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + int(value)
+        if self.on_count is not None:
+            self.on_count(name, int(value))
+
+    def progress(self, fraction):
+        if self.on_progress is not None:
+            self.on_progress(fraction)
+
+    def peak(self, name, value):
+        self.peaks[name] = max(self.peaks.get(name, 0), int(value))
+
+    # Adds the timings and counters of a profile recorded elsewhere, e.g. in
+    # a worker process. Phase times from several workers are added together
+    def merge(self, phases, counters, peaks):
+        for name, seconds in phases.items():
+            self.add_time(name, seconds)
+        for name, value in counters.items():
+            self.count(name, value)
+        for name, value in peaks.items():
+            self.peak(name, value)
+
+    def to_dict(self):
+        return {"phases": dict(self.phases), "counters": dict(self.counters),
+                "peaks": dict(self.peaks)}
+
+
+# Floyd-Warshall all pairs shortest paths, one whole-matrix update per
+# intermediate town. edge_weights_matrix has 0 where towns are not directly
+# linked. Returns the distances between every pair of towns, and a matrix
+# where predecessors[i, j] is the index of the town before j on the shortest
+# path from i to j (-1 when i == j).
+# Links can be travelled both ways, so a link given in only one direction
+# is used in both, and routes can be reversed/looked up either way round.
+# Raises ValueError if the two directions of a link have different weights
+def all_pairs_shortest_paths(edge_weights_matrix):
+    edge_weights_matrix = np.asarray(edge_weights_matrix)
+    reverse_weights = edge_weights_matrix.T
+    if ((edge_weights_matrix > 0) & (reverse_weights > 0) &
+            (edge_weights_matrix != reverse_weights)).any():
+        raise ValueError("Links must have the same weight in both directions")
+    edge_weights_matrix = np.maximum(edge_weights_matrix, reverse_weights)
+
+    number_of_towns = len(edge_weights_matrix)
+    distances = np.where(edge_weights_matrix > 0, edge_weights_matrix,
+                         UNREACHABLE).astype(np.int32)
+    np.fill_diagonal(distances, 0)
+
+    predecessors = np.repeat(
+        np.arange(number_of_towns, dtype=np.int8)[:, np.newaxis],
+        number_of_towns, axis=1)
+    np.fill_diagonal(predecessors, -1)
+
+    for town in range(number_of_towns):
+        through_town = distances[:, town, np.newaxis] + distances[town, :]
+        shorter = through_town < distances
+        distances = np.where(shorter, through_town, distances)
+        predecessors = np.where(shorter, predecessors[town, :], predecessors)
+
+    return distances, predecessors
+
+
+# Compact tables for following shortest paths forwards, built from the
+# predecessor matrix: next_hops[i, j] is the index of the town after i on the
+# shortest path from i to j (-1 when i == j), and hop_counts[i, j] the number
+# of steps on that path. Both are int8, so a few kilobytes for the board
+def path_tables(predecessors):
+    predecessors = np.asarray(predecessors, dtype=np.intp)
+    number_of_towns = len(predecessors)
+    rows = np.arange(number_of_towns)[:, np.newaxis]
+    direct = predecessors == rows
+    np.fill_diagonal(direct, False)
+
+    next_hops = np.where(direct, np.arange(number_of_towns), -1)
+    hop_counts = direct.astype(np.intp)
+
+    # The path to j is the path to the town before j, plus one more step.
+    # Each pass resolves every pair whose town before j is already resolved
+    unresolved = ~direct
+    np.fill_diagonal(unresolved, False)
+    while unresolved.any():
+        before = next_hops[rows, predecessors]
+        ready = unresolved & (before >= 0)
+        next_hops = np.where(ready, before, next_hops)
+        hop_counts = np.where(
+            ready, hop_counts[rows, predecessors] + 1, hop_counts)
+        unresolved &= ~ready
+
+    return next_hops.astype(np.int8), hop_counts.astype(np.int8)
+
+
+# Every town visited along each route, built with whole-array operations
+# into a single preallocated array: one row per route, padded with 0 after
+# the route's last town. Also returns the number of towns in each route.
+# All routes take one step at a time together, so the number of passes is
+# the largest number of steps between two consecutive cards
+def expand_routes_array(next_hops, hop_counts, routes):
+    if len(routes) == 0:
+        return np.zeros((0, 1), dtype=np.int8), np.zeros(0, dtype=np.intp)
+    routes = np.asarray(routes, dtype=np.intp)
+    routes = routes.reshape(len(routes), -1) - 1
+    sources = routes[:, :-1]
+    targets = routes[:, 1:]
+
+    segment_hops = hop_counts[sources, targets].astype(np.intp)
+    offsets = np.cumsum(segment_hops, axis=1) - segment_hops
+    lengths = segment_hops.sum(axis=1) + 1
+
+    towns = np.zeros((len(routes), lengths.max(initial=1)), dtype=np.int8)
+    towns[:, 0] = routes[:, 0] + 1
+    current = sources.copy()
+    for step in range(segment_hops.max(initial=0)):
+        moving = step < segment_hops
+        current = np.where(moving, next_hops[current, targets], current)
+        route, segment = np.nonzero(moving)
+        towns[route, offsets[route, segment] + step + 1] = (
+            current[route, segment] + 1)
+    return towns, lengths
+
+
+# Lists every town visited along each route, as a list of card numbers for
+# each route
+def expand_routes(predecessors, routes):
+    towns, lengths = expand_routes_array(*path_tables(predecessors), routes)
+    return [row[:length].tolist() for row, length in zip(towns, lengths)]
+
+
+# Keeps only the first of each identical route, using a set of the routes
+# seen so far rather than comparing every pair of routes
+def remove_duplicate_routes(routes):
+    seen_routes = set()
+    kept_routes = []
+    for route in routes:
+        if tuple(route) not in seen_routes:
+            kept_routes.append(route)
+            seen_routes.add(tuple(route))
+    return kept_routes
+
+
+# When both Entry/Exit Cards are the same, keeps only the first of each
+# route and its reverse
+def remove_symmetrical_routes(routes, entry_pair):
+    if entry_pair[0] != entry_pair[1]:
+        return list(routes)
+    seen_routes = set()
+    kept_routes = []
+    for route in routes:
+        if tuple(reversed(route)) not in seen_routes:
+            kept_routes.append(route)
+        seen_routes.add(tuple(route))
+    return kept_routes
+
+
+# Builds full routes (Entry/Exit Card, Town Cards, Entry/Exit Card) from
+# orderings of the indices of town_cards
+def orderings_to_routes(entry_pair, town_cards, orderings):
+    town_cards = np.asarray(town_cards)
+    orderings = np.asarray(orderings, dtype=np.intp).reshape(
+        -1, len(town_cards))
+    start_entry = np.full((len(orderings), 1), entry_pair[0])
+    end_entry = np.full((len(orderings), 1), entry_pair[1])
+    return np.hstack((start_entry, town_cards[orderings], end_entry))
+
+
+# Distances between the cards in a hand, indexed by position in the hand:
+# Town Cards are 0 to n-1, followed by the two Entry/Exit Cards (n and n+1)
+def hand_distances(distances, entry_pair, town_cards):
+    indices = np.append(np.asarray(town_cards, dtype=np.intp),
+                        entry_pair) - 1
+    return distances[np.ix_(indices, indices)].astype(np.int32)
+
+
+# Number of permutations scored at a time by permutation_routes. Peak memory
+# is roughly chunk_size * (n + 6) bytes, however many permutations there are
+PERMUTATION_CHUNK_SIZE = 100000
+
+
+# Orderings of range(n) to be scored, and how many there are. If first is
+# given, only orderings starting with that town are included. If canonical,
+# only orderings whose first town is lower than their last are included:
+# when the route starts and ends at the same card, every other ordering is
+# just one of these reversed
+def _orderings(n, first=None, canonical=False):
+    if not canonical:
+        if first is None:
+            return itertools.permutations(range(n)), math.factorial(n)
+        others = [town for town in range(n) if town != first]
+        return ((first,) + permutation for permutation
+                in itertools.permutations(others)), math.factorial(n - 1)
+
+    firsts = range(n) if first is None else [first]
+    pairs = [(first, last) for first in firsts for last in range(first + 1, n)]
+    orderings = (
+        (first,) + middle + (last,) for first, last in pairs
+        for middle in itertools.permutations(
+            [town for town in range(n) if town not in (first, last)]))
+    return orderings, len(pairs) * math.factorial(n - 2)
+
+
+# Yields every ordering of range(n) (see _orderings for first and canonical)
+# as blocks of at most chunk_size rows. Stored as int8 since a hand never
+# has more than 127 Town Cards
+def permutation_chunks(n, chunk_size=PERMUTATION_CHUNK_SIZE, first=None,
+                       canonical=False):
+    permutations, remaining = _orderings(n, first, canonical)
+    while remaining > 0:
+        rows = min(chunk_size, remaining)
+        chunk = np.fromiter(
+            itertools.chain.from_iterable(
+                itertools.islice(permutations, rows)),
+            dtype=np.int8, count=rows * n)
+        remaining -= rows
+        yield chunk.reshape(rows, n)
+
+
+# Reversing the route gives the same length when it starts and finishes at
+# the same card, as long as distances are the same in both directions
+def is_symmetric_hand(hand_matrix, entry_pair):
+    return (entry_pair[0] == entry_pair[1] and hand_matrix.shape[0] > 3
+            and np.array_equal(hand_matrix, hand_matrix.T))
+
+
+# Adds the reverse of each ordering, sorted into itertools.permutations order
+def with_mirrored_orderings(orderings):
+    orderings = {tuple(int(town) for town in ordering)
+                 for ordering in orderings}
+    orderings |= {ordering[::-1] for ordering in orderings}
+    return sorted(orderings)
+
+
+# Length of the route for each row of orderings, using whole-column fancy
+# indexing into the hand's distance matrix rather than one town at a time
+def score_orderings(hand_matrix, orderings):
+    n = orderings.shape[1]
+    routes = np.empty((len(orderings), n + 2), dtype=np.int8)
+    routes[:, 0] = n
+    routes[:, 1:-1] = orderings
+    routes[:, -1] = n + 1
+    lengths = np.zeros(len(orderings), dtype=np.int32)
+    for step in range(n + 1):
+        lengths += hand_matrix[routes[:, step], routes[:, step + 1]]
+    return lengths
+
+
+# Scores each chunk of orderings, keeping only the shortest length so far
+# and its tied orderings between chunks. With total (the number of
+# orderings in chunks), progress is reported after each chunk
+def _shortest_orderings(hand_matrix, chunks, profile, total=None):
+    min_length = UNREACHABLE
+    tied_orderings = []
+    scored = 0
+
+    while True:
+        with profile.phase("generate orderings"):
+            orderings = next(chunks, None)
+        if orderings is None:
+            break
+        with profile.phase("score orderings"):
+            route_lengths = score_orderings(hand_matrix, orderings)
+        profile.count("orderings scored", len(orderings))
+        scored += len(orderings)
+        if total is not None:
+            profile.progress(scored / total)
+        # Orderings, the routes built from them and their lengths
+        profile.peak("array bytes", orderings.nbytes * 2 +
+                     route_lengths.nbytes + 2 * len(orderings))
+
+        # Finding the minimum route length in this chunk, and its indices
+        chunk_min = np.min(route_lengths)
+        if chunk_min > min_length:
+            continue
+        if chunk_min < min_length:
+            min_length = chunk_min
+            tied_orderings = []
+        min_indices = np.flatnonzero(route_lengths == chunk_min)
+        tied_orderings.append(orderings[min_indices])
+
+    if not tied_orderings:
+        return int(min_length), np.empty((0, hand_matrix.shape[0] - 2),
+                                         dtype=np.int8)
+    return int(min_length), np.vstack(tied_orderings)
+
+
+# Run in a worker process: scores every ordering starting with first.
+# Returns the worker's profile too, to be merged into the caller's
+def _shortest_orderings_from(hand_matrix, n, first, chunk_size, canonical):
+    profile = SolveProfile()
+    min_length, tied_orderings = _shortest_orderings(
+        hand_matrix, permutation_chunks(n, chunk_size, first, canonical),
+        profile)
+    return min_length, tied_orderings, profile.to_dict()
+
+
+# Reference solver: scores every permutation of town_cards. O(n!) time, so
+# only suitable for small hands or for cross-checking the other solvers.
+# Permutations are streamed in chunks, so memory use stays constant. With
+# more than one worker, the permutations are split by first town visited
+# across a process pool, and the results merged in the same order as the
+# serial search. When both Entry/Exit Cards are the same, only half of the
+# orderings are scored and the mirrored routes are added at the end
+def permutation_routes(distances, entry_pair, town_cards,
+                       chunk_size=PERMUTATION_CHUNK_SIZE, workers=1,
+                       profile=None):
+    if profile is None:
+        profile = SolveProfile()
+    n = len(town_cards)
+    hand_matrix = hand_distances(distances, entry_pair, town_cards)
+    canonical = is_symmetric_hand(hand_matrix, entry_pair)
+
+    if workers <= 1 or n <= 1:
+        _, total = _orderings(n, canonical=canonical)
+        min_length, tied_orderings = _shortest_orderings(
+            hand_matrix, permutation_chunks(n, chunk_size,
+                                            canonical=canonical),
+            profile, total)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(
+                _shortest_orderings_from, itertools.repeat(hand_matrix),
+                itertools.repeat(n), range(n), itertools.repeat(chunk_size),
+                itertools.repeat(canonical)))
+        for _, _, worker_profile in results:
+            profile.merge(**worker_profile)
+        min_length = min(length for length, _, _ in results)
+        tied_orderings = np.vstack([orderings for length, orderings, _
+                                    in results if length == min_length])
+
+    if canonical:
+        tied_orderings = with_mirrored_orderings(tied_orderings)
+    return min_length, orderings_to_routes(
+        entry_pair, town_cards, tied_orderings), True
+
+
+# Held-Karp dynamic programming solver. O(2^n * n^2) time, O(2^n * n) memory.
+# best[mask, j] is the length of the shortest path that leaves the first
+# Entry/Exit Card, visits exactly the towns in mask and finishes at town j
+def held_karp_routes(distances, entry_pair, town_cards, profile=None):
+    if profile is None:
+        profile = SolveProfile()
+    n = len(town_cards)
+    start = entry_pair[0] - 1
+    end = entry_pair[1] - 1
+
+    if n == 0:
+        return int(distances[start, end]), np.array(
+            [[entry_pair[0], entry_pair[1]]]), True
+
+    town_indices = np.asarray(town_cards) - 1
+    between = distances[np.ix_(town_indices, town_indices)].astype(np.int32)
+    from_start = distances[start, town_indices].astype(np.int32)
+    to_end = distances[town_indices, end].astype(np.int32)
+
+    all_masks = np.arange(1 << n)
+    best = np.full((1 << n, n), UNREACHABLE, dtype=np.int32)
+    best[1 << np.arange(n), np.arange(n)] = from_start
+
+    # Group masks by number of towns visited, so each layer only depends
+    # on the previous one and can be filled in with whole-array operations
+    towns_in_mask = np.zeros(1 << n, dtype=np.int8)
+    for town in range(n):
+        towns_in_mask += (all_masks >> town) & 1
+
+    with profile.phase("fill table"):
+        for size in range(2, n + 1):
+            layer = all_masks[towns_in_mask == size]
+            for town in range(n):
+                masks = layer[(layer >> town) & 1 == 1]
+                previous = masks ^ (1 << town)
+                best[masks, town] = np.min(
+                    best[previous] + between[:, town], axis=1)
+            profile.progress((size - 1) / (n - 1))
+    profile.count("states", best.size)
+    profile.peak("array bytes", best.nbytes + all_masks.nbytes +
+                 towns_in_mask.nbytes)
+
+    full_mask = (1 << n) - 1
+    totals = best[full_mask] + to_end
+    min_length = np.min(totals)
+
+    # Walk back through best to recover every tied optimal ordering
+    orderings = []
+    with profile.phase("backtrack"):
+        for last in np.flatnonzero(totals == min_length):
+            orderings += _held_karp_orderings(
+                best, between, full_mask, last)
+
+    # Sorted so routes come out in the same order as itertools.permutations
+    orderings.sort()
+    return int(min_length), orderings_to_routes(
+        entry_pair, town_cards, orderings), True
+
+
+def _held_karp_orderings(best, between, mask, last):
+    if mask == 1 << last:
+        return [[last]]
+    previous = mask ^ (1 << last)
+    candidates = best[previous] + between[:, last]
+    orderings = []
+    for town in np.flatnonzero(candidates == best[mask, last]):
+        for ordering in _held_karp_orderings(best, between, previous, town):
+            orderings.append(ordering + [last])
+    return orderings
+
+
+# Raised inside _search_orderings when the time limit is reached
+class _OutOfTime(Exception):
+    pass
+
+
+# Depth-first search through the orderings of a hand's Town Cards, shared
+# by branch_and_bound_routes and near_optimal_routes. costs is the hand's
+# distance matrix as lists, with the Entry/Exit Cards last. Partial routes
+# are abandoned as soon as their length plus a lower bound on the rest of
+# the route is longer than worst_allowed(), and on_route(length, ordering)
+# is called for every complete route no longer than that. When canonical,
+# only routes whose first town is lower than their last are searched.
+# Returns False if the deadline (from timer()) was reached first
+def _search_orderings(costs, canonical, worst_allowed, on_route,
+                      deadline=None, profile=None):
+    if profile is None:
+        profile = SolveProfile()
+    n = len(costs) - 2
+    full_mask = (1 << n) - 1
+    start = n
+    end = n + 1
+    bounds = {}
+    nodes_visited = 0
+
+    def lower_bound(current, mask):
+        key = (current, mask)
+        if key not in bounds:
+            remaining = [town for town in range(n) if mask >> town & 1 == 0]
+            bounds[key] = max(
+                _cheapest_outgoing_bound(costs, current, remaining, end),
+                _spanning_tree_bound(costs, [current] + remaining + [end]))
+        return bounds[key]
+
+    def extend(current, mask, length, ordering):
+        nonlocal nodes_visited
+        nodes_visited += 1
+        if deadline is not None and nodes_visited % 1024 == 0:
+            if timer() > deadline:
+                raise _OutOfTime
+
+        if mask == full_mask:
+            if canonical and ordering[-1] < ordering[0]:
+                return
+            total = length + costs[current][end]
+            if total <= worst_allowed():
+                on_route(total, ordering)
+            return
+
+        # Try nearest towns first, so good routes are found early
+        remaining = [town for town in range(n) if mask >> town & 1 == 0]
+        remaining.sort(key=lambda town: costs[current][town])
+        for town in remaining:
+            new_length = length + costs[current][town]
+            new_mask = mask | 1 << town
+            if canonical and ordering and not any(
+                    other > ordering[0] for other in remaining
+                    if other != town or new_mask == full_mask):
+                continue
+            if new_length + lower_bound(town, new_mask) > worst_allowed():
+                continue
+            ordering.append(town)
+            extend(town, new_mask, new_length, ordering)
+            ordering.pop()
+
+    try:
+        with profile.phase("search"):
+            extend(start, 0, 0, [])
+        finished = True
+    except _OutOfTime:
+        finished = False
+    profile.count("nodes visited", nodes_visited)
+    profile.count("bounds computed", len(bounds))
+    return finished
+
+
+# Depth-first branch and bound solver. Partial routes are abandoned as soon
+# as their length plus a lower bound on the rest of the route is longer than
+# the best route found so far. If time_limit (seconds) runs out, the best
+# route/s found so far are returned, and proven_optimal is False.
+# on_improvement(length, route) is called each time a shorter route is found
+def branch_and_bound_routes(distances, entry_pair, town_cards,
+                            time_limit=None, on_improvement=None,
+                            profile=None):
+    n = len(town_cards)
+    hand_matrix = hand_distances(distances, entry_pair, town_cards)
+    costs = hand_matrix.tolist()
+
+    # When both Entry/Exit Cards are the same, only routes whose first town
+    # is lower than their last are searched, and mirrored routes added after
+    canonical = is_symmetric_hand(hand_matrix, entry_pair)
+
+    deadline = None if time_limit is None else timer() + time_limit
+    best_orderings = set()
+    best_length = UNREACHABLE
+
+    def report(length, ordering):
+        if on_improvement is not None:
+            on_improvement(length, orderings_to_routes(
+                entry_pair, town_cards, [ordering])[0])
+
+    def on_route(length, ordering):
+        nonlocal best_length
+        if length < best_length:
+            best_length = length
+            best_orderings.clear()
+            report(length, ordering)
+        best_orderings.add(tuple(ordering))
+
+    # Nearest neighbour route gives a starting best length straight away
+    greedy_length, greedy_ordering = _nearest_neighbour(costs, n, n + 1, n)
+    best_length = greedy_length
+    best_orderings.add(tuple(greedy_ordering))
+    report(greedy_length, greedy_ordering)
+
+    proven_optimal = _search_orderings(
+        costs, canonical, lambda: best_length, on_route, deadline, profile)
+
+    if canonical:
+        best_orderings = with_mirrored_orderings(best_orderings)
+    return int(best_length), orderings_to_routes(
+        entry_pair, town_cards, sorted(best_orderings)), proven_optimal
+
+
+# Finds the k shortest routes and/or every route within slack of the
+# shortest, as route lengths and routes sorted by length (ties in
+# itertools.permutations order). Uses the same search and lower bounds as
+# branch_and_bound_routes, but only abandons partial routes which cannot beat
+# the worst route kept so far. Kept routes are held in a heap with the worst
+# on top, so at most k routes are held at once however large the hand. When
+# both Entry/Exit Cards are the same, a route and its reverse count as one
+# of the k, and both are returned. If time_limit (seconds) runs out, the
+# best routes found so far are returned, and the third value is False.
+# Given longer_than (e.g. the optimal length, to list the next shortest
+# routes), only longer routes are kept and counted, and slack is counted
+# from longer_than
+def near_optimal_routes(distances, entry_pair, town_cards, k=None, slack=None,
+                        time_limit=None, profile=None, longer_than=None):
+    if k is None and slack is None:
+        raise ValueError("Give k, slack or both")
+    if k is not None and k < 1:
+        raise ValueError("k must be at least 1")
+    if slack is not None and slack < 0:
+        raise ValueError("slack must not be negative")
+    if profile is None:
+        profile = SolveProfile()
+    hand_matrix = hand_distances(distances, entry_pair, town_cards)
+    costs = hand_matrix.tolist()
+    canonical = is_symmetric_hand(hand_matrix, entry_pair)
+
+    deadline = None if time_limit is None else timer() + time_limit
+    # Entries are (-length, -ordering), so the worst route is kept on top
+    kept = []
+    best_length = UNREACHABLE if longer_than is None else longer_than
+
+    def worst_allowed():
+        limit = UNREACHABLE
+        if k is not None and len(kept) >= k:
+            limit = -kept[0][0]
+        if slack is not None:
+            limit = min(limit, best_length + slack)
+        return limit
+
+    def keep(length, ordering):
+        nonlocal best_length
+        if longer_than is not None and length <= longer_than:
+            return
+        heapq.heappush(kept, (-length, tuple(-town for town in ordering)))
+        best_length = min(best_length, length)
+        while k is not None and len(kept) > k:
+            heapq.heappop(kept)
+        while slack is not None and -kept[0][0] > best_length + slack:
+            heapq.heappop(kept)
+
+    proven_optimal = _search_orderings(
+        costs, canonical, worst_allowed, keep, deadline, profile)
+
+    found = [(-length, tuple(-town for town in ordering))
+             for length, ordering in kept]
+    if canonical:
+        found += [(length, ordering[::-1]) for length, ordering in found]
+    found = sorted(set(found))
+    profile.count("near-optimal routes", len(found))
+    return [length for length, _ in found], orderings_to_routes(
+        entry_pair, town_cards, [ordering for _, ordering in found]), \
+        proven_optimal
+
+
+# Always visits the closest town not yet visited
+def _nearest_neighbour(costs, start, end, n):
+    remaining = list(range(n))
+    current = start
+    length = 0
+    ordering = []
+    while remaining:
+        town = min(remaining, key=lambda town: costs[current][town])
+        remaining.remove(town)
+        length += costs[current][town]
+        ordering.append(town)
+        current = town
+    return length + costs[current][end], ordering
+
+
+# The current town and every remaining town must each be left exactly once,
+# towards a remaining town or the final Entry/Exit Card
+def _cheapest_outgoing_bound(costs, current, remaining, end):
+    targets = remaining + [end]
+    bound = 0
+    for town in [current] + remaining:
+        bound += min(costs[town][target]
+                     for target in targets if target != town)
+    return bound
+
+
+# The rest of the route is a path through all of nodes, which is a spanning
+# tree, so it is at least as long as the minimum spanning tree (Prim's)
+def _spanning_tree_bound(costs, nodes):
+    closest = {node: costs[nodes[0]][node] for node in nodes[1:]}
+    bound = 0
+    while closest:
+        node = min(closest, key=closest.get)
+        bound += closest.pop(node)
+        for other in closest:
+            if costs[node][other] < closest[other]:
+                closest[other] = costs[node][other]
+    return bound
+
+
+# Available solvers, selected by name. Each returns the optimal route
+# length, every route of that length and whether the result is proven optimal
+SOLVERS = {
+    "held-karp": held_karp_routes,
+    "branch-and-bound": branch_and_bound_routes,
+    "permutations": permutation_routes,
+}
+
+# Solvers which accept a time limit and return the best route found so far
+ANYTIME_SOLVERS = ["branch-and-bound"]
+
+# Solvers which can split their search across several worker processes
+PARALLEL_SOLVERS = ["permutations"]
+
+# Number of Town Cards above which each solver may be slow/use a lot of memory
+SOLVER_CARD_LIMITS = {
+    "held-karp": 18,
+    "branch-and-bound": 14,
+    "permutations": 9,
+}
+
+# Fewest Town Cards for which each solver takes a hundred milliseconds or
+# more, so that solving the hand in another process is worth the cost of
+# starting/sending work to it (tens of milliseconds). Smaller hands are
+# quicker solved in place
+HEAVY_CARD_COUNTS = {
+    "held-karp": 17,
+    "branch-and-bound": 12,
+    "permutations": 9,
+}
+
+
+# Returns the optimal route length and every route of that length from a
+# SolutionCache without searching, or None if the hand is not cached.
+# town_cards must be sorted
+def known_routes(entry_pair, town_cards, cache=None, profile=None):
+    if profile is None:
+        profile = SolveProfile()
+
+    if cache is not None:
+        with profile.phase("cache lookup"):
+            cached = cache.get(entry_pair, town_cards)
+        if cached is not None:
+            profile.count("cache hits")
+            profile.count("tied optima", len(cached[1]))
+            return cached
+    return None
+
+
+# Returns the optimal route length, every route of that length and whether
+# the result is proven optimal. time_limit and workers are ignored by
+# solvers which do not support them. With a SolutionCache (see
+# solution_cache.py), hands that have been solved before are returned from
+# the cache, and Town Cards are always solved in sorted order so routes are
+# listed in the same order however the hand was entered. With a
+# SolveProfile, the time taken by each phase and the work done are recorded
+def find_optimal_routes(distances, entry_pair, town_cards,
+                        method="held-karp", time_limit=None, workers=1,
+                        cache=None, profile=None):
+    if method not in SOLVERS:
+        raise ValueError(f"Unknown solver method: {method}")
+    if profile is None:
+        profile = SolveProfile()
+
+    if cache is not None:
+        town_cards = sorted(town_cards)
+        known = known_routes(entry_pair, town_cards, cache, profile)
+        if known is not None:
+            return known[0], known[1], True
+
+    options = {"profile": profile}
+    if method in ANYTIME_SOLVERS:
+        options["time_limit"] = time_limit
+    if method in PARALLEL_SOLVERS:
+        options["workers"] = workers
+    min_length, routes, proven_optimal = SOLVERS[method](
+        distances, entry_pair, town_cards, **options)
+    profile.count("tied optima", len(routes))
+
+    # Only proven optimal results are cached
+    if cache is not None and proven_optimal:
+        cache.put(entry_pair, town_cards, min_length, routes)
+    return min_length, routes, proven_optimal
+
+
+# List of all Entry/Exit Cards on the Discovering Ireland board. Not part of
+# the Google Sheet, so must be manually entered
+ENTRY_CARDS = [5, 9, 31, 39, 47, 50]
+
+
+# Result of solving one hand. routes lists the order to visit the dealt
+# cards in, towns_visited every town passed through along each route (with
+# identical and mirrored routes removed), time_taken is in seconds
+class Solution:
+
+    def __init__(self, entry_cards, town_cards, length, routes,
+                 towns_visited, proven_optimal, time_taken):
+        self.entry_cards = entry_cards
+        self.town_cards = town_cards
+        self.length = length
+        self.routes = routes
+        self.towns_visited = towns_visited
+        self.proven_optimal = proven_optimal
+        self.time_taken = time_taken
+
+    def to_dict(self):
+        return {
+            "entry_cards": [int(card) for card in self.entry_cards],
+            "town_cards": [int(card) for card in self.town_cards],
+            "length": int(self.length),
+            "routes": np.asarray(self.routes).tolist(),
+            "towns_visited": self.towns_visited,
+            "proven_optimal": self.proven_optimal,
+            "time_taken": self.time_taken,
+        }
+
+
+# The game board: shortest distances and paths between every pair of towns,
+# town names and which cards are Entry/Exit Cards. Cards are numbered from 1,
+# and row/column index of distances and predecessors is card number - 1.
+# Raises ValueError if distances are not the same in both directions, as
+# solvers, the solution cache and mirrored route removal all rely on that
+class Board:
+
+    def __init__(self, distances, predecessors, town_names,
+                 entry_cards=ENTRY_CARDS, source_hash=""):
+        if not np.array_equal(distances, np.transpose(distances)):
+            raise ValueError("Distances must be the same in both directions")
+        self.distances = distances
+        self.predecessors = predecessors
+        self.town_names = list(town_names)
+        self.entry_cards = list(entry_cards)
+        self.source_hash = source_hash
+        self.next_hops, self.hop_counts = path_tables(predecessors)
+        self.all_cards = list(range(1, len(self.town_names) + 1))
+        self.town_cards = [card for card in self.all_cards
+                           if card not in self.entry_cards]
+
+    # Builds a board from the distances between directly linked towns
+    @classmethod
+    def from_edge_weights(cls, edge_weights_matrix, town_names,
+                          entry_cards=ENTRY_CARDS):
+        distances, predecessors = all_pairs_shortest_paths(
+            np.asarray(edge_weights_matrix))
+        return cls(distances, predecessors, town_names, entry_cards)
+
+    # Returns a description of what is wrong with the hand, or None if valid
+    def hand_error(self, entry_pair, town_cards):
+        if len(entry_pair) != 2:
+            return "Players must have exactly 2 Entry/Exit Cards."
+        if len(town_cards) == 0:
+            return "Players must have at least 1 Town Card."
+        if len(town_cards) != len(set(town_cards)):
+            return "Duplicates found."
+        if not all(card in self.entry_cards for card in entry_pair):
+            return "Entry/Exit Cards must be one of " + ", ".join(
+                str(card) for card in self.entry_cards) + "."
+        if not all(card in self.town_cards for card in town_cards):
+            return "Town Cards must not include any Entry/Exit Cards, and " \
+                f"must be between 1 and {len(self.all_cards)} (inclusive)."
+        return None
+
+    # Finds the shortest route/s for a hand. Raises ValueError if the hand
+    # is not valid. See find_optimal_routes for the other options
+    def solve(self, entry_pair, town_cards, method="held-karp",
+              time_limit=None, workers=1, cache=None, profile=None):
+        start = timer()
+        entry_pair = [int(card) for card in entry_pair]
+        town_cards = [int(card) for card in town_cards]
+        error = self.hand_error(entry_pair, town_cards)
+        if error is not None:
+            raise ValueError(error)
+
+        if profile is None:
+            profile = SolveProfile()
+
+        length, routes, proven_optimal = find_optimal_routes(
+            self.distances, entry_pair, town_cards, method=method,
+            time_limit=time_limit, workers=workers, cache=cache,
+            profile=profile)
+        return self._solution(entry_pair, town_cards, length, routes,
+                              proven_optimal, start, profile)
+
+    # Solves every player's hand at a table (a list of (entry_pair,
+    # town_cards)), returning a Solution for each in the same order. Raises
+    # ValueError naming the first player whose hand is not valid. Hands in
+    # the cache are answered straight away, and with more than one
+    # worker, hands large enough to be slow (HEAVY_CARD_COUNTS) are solved
+    # at the same time in a process pool
+    def solve_table(self, hands, method="held-karp", time_limit=None,
+                    workers=1, cache=None):
+        hands = [([int(card) for card in entry_pair],
+                  sorted(int(card) for card in town_cards))
+                 for entry_pair, town_cards in hands]
+        for player, (entry_pair, town_cards) in enumerate(hands, start=1):
+            error = self.hand_error(entry_pair, town_cards)
+            if error is not None:
+                raise ValueError(f"Player {player}: {error}")
+
+        if workers <= 1 or len(hands) <= 1:
+            return [self.solve(entry_pair, town_cards, method=method,
+                               time_limit=time_limit, cache=cache)
+                    for entry_pair, town_cards in hands]
+
+        solutions = [None] * len(hands)
+        unsolved = []
+        for player, (entry_pair, town_cards) in enumerate(hands):
+            start = timer()
+            known = known_routes(entry_pair, town_cards, cache)
+            if known is None:
+                unsolved.append(player)
+            else:
+                solutions[player] = self._solution(
+                    entry_pair, town_cards, known[0], known[1], True, start,
+                    SolveProfile())
+
+        # Starting a process pool is only worth it for more than one heavy
+        # hand, so the rest are solved here
+        heavy = [player for player in unsolved
+                 if len(hands[player][1]) >= HEAVY_CARD_COUNTS[method]]
+        if len(heavy) <= 1:
+            heavy = []
+        for player in unsolved:
+            if player not in heavy:
+                entry_pair, town_cards = hands[player]
+                solutions[player] = self.solve(
+                    entry_pair, town_cards, method=method,
+                    time_limit=time_limit)
+        if heavy:
+            with ProcessPoolExecutor(
+                    max_workers=min(workers, len(heavy))) as executor:
+                solved = executor.map(
+                    self.solve, [hands[player][0] for player in heavy],
+                    [hands[player][1] for player in heavy],
+                    itertools.repeat(method), itertools.repeat(time_limit))
+                for player, solution in zip(heavy, solved):
+                    solutions[player] = solution
+
+        # The cache was already checked above, so hands are solved without
+        # it and added here. Only proven optimal results are cached
+        if cache is not None:
+            for player in unsolved:
+                solution = solutions[player]
+                if solution.proven_optimal:
+                    cache.put(solution.entry_cards, solution.town_cards,
+                              solution.length, solution.routes)
+        return solutions
+
+    # Every town visited along each route, as a list for each route
+    def expand_routes(self, routes):
+        towns, lengths = expand_routes_array(self.next_hops, self.hop_counts,
+                                             routes)
+        return [row[:length].tolist() for row, length in zip(towns, lengths)]
+
+    # Expands the routes found for a hand into a Solution
+    def _solution(self, entry_pair, town_cards, length, routes,
+                  proven_optimal, start, profile):
+        with profile.phase("expand routes"):
+            towns_visited = self.expand_routes(routes)
+        with profile.phase("remove duplicates"):
+            towns_visited = remove_symmetrical_routes(
+                remove_duplicate_routes(towns_visited), entry_pair)
+        profile.count("routes kept", len(towns_visited))
+        return Solution(entry_pair, town_cards, length, routes,
+                        towns_visited, proven_optimal, timer() - start)
+
+    # Finds the k shortest routes and/or every route within slack of the
+    # shortest, or only routes longer than longer_than (see
+    # near_optimal_routes). Returns a Solution for each different set of
+    # towns visited, shortest first
+    def near_optimal(self, entry_pair, town_cards, k=None, slack=None,
+                     time_limit=None, profile=None, longer_than=None):
+        start = timer()
+        entry_pair = [int(card) for card in entry_pair]
+        town_cards = sorted(int(card) for card in town_cards)
+        error = self.hand_error(entry_pair, town_cards)
+        if error is not None:
+            raise ValueError(error)
+
+        # Different orderings can visit the same towns, so search again for
+        # more orderings until there are k different routes (or no more)
+        wanted = k
+        found = None
+        while True:
+            remaining_time = (None if time_limit is None else
+                              max(0, time_limit - (timer() - start)))
+            route_lengths, routes, proven_optimal = near_optimal_routes(
+                self.distances, entry_pair, town_cards, k=wanted,
+                slack=slack, time_limit=remaining_time, profile=profile,
+                longer_than=longer_than)
+
+            solutions = []
+            seen_routes = set()
+            for length, route, towns_visited in zip(
+                    route_lengths, routes, self.expand_routes(routes)):
+                # Skip identical routes, and mirrored routes when both
+                # Entry/Exit Cards are the same
+                if tuple(towns_visited) in seen_routes or (
+                        entry_pair[0] == entry_pair[1] and
+                        tuple(reversed(towns_visited)) in seen_routes):
+                    continue
+                seen_routes.add(tuple(towns_visited))
+                solutions.append(Solution(
+                    entry_pair, town_cards, length, [route], [towns_visited],
+                    proven_optimal, timer() - start))
+
+            if (k is None or len(solutions) >= k or not proven_optimal or
+                    len(route_lengths) == found):
+                return solutions[:k]
+            found = len(route_lengths)
+            wanted += k - len(solutions)
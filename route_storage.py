@@ -0,0 +1,161 @@
+import json
+import sqlite3
+
+
+# Raised by every storage backend when saving or loading fails
+class StorageError(Exception):
+    pass
+
+
+# Raised when saving under a name which is already in use
+class SaveNameTaken(StorageError):
+    pass
+
+
+# Raised when loading a name which has not been saved
+class SaveNotFound(StorageError):
+    pass
+
+
+# Builds the values of a saved sheet: dealt hand in the first column, one
+# column for each route after that, padded with empty cells to equal length
+def saved_routes_values(dealt_hand, results_list):
+    columns = [["Dealt Hand"] + [str(card) for card in dealt_hand]]
+    for i in range(len(results_list)):
+        columns.append([f"Route {i+1}"] +
+                       [str(town) for town in results_list[i]])
+
+    number_of_rows = max(len(column) for column in columns)
+    return [[column[row] if row < len(column) else ""
+             for column in columns] for row in range(number_of_rows)]
+
+
+# Splits the values of a saved sheet into Entry/Exit Cards, Town Cards and
+# routes. Rows may be different lengths, as trailing empty cells are omitted
+def parse_saved_routes(saved_data):
+    number_of_columns = max(len(row) for row in saved_data)
+    columns = []
+    for i in range(number_of_columns):
+        column = [row[i] if i < len(row) else "" for row in saved_data]
+        # Remove the header and any empty cells padding the column
+        while column and column[-1] == "":
+            column.pop()
+        columns.append(column[1:])
+
+    # Separate Entry/Exit and Town Cards
+    saved_dealt = columns[0]
+    saved_entry_cards = tuple(int(card) for card in saved_dealt[0:2])
+    saved_town_cards = tuple(int(card) for card in saved_dealt[2:])
+
+    # Routes are in the second column onward
+    all_saved_routes = tuple(tuple(route) for route in columns[1:])
+
+    return saved_entry_cards, saved_town_cards, all_saved_routes
+
+
+# Each save is a worksheet named saved_routes_<name> in the Google Sheet.
+# get_sheet is called whenever the sheet is needed, so connecting can be
+# left until the first save/load
+class SheetsStorage:
+
+    def __init__(self, get_sheet):
+        self.get_sheet = get_sheet
+
+    # Connecting can fail in many ways (no network, missing creds.json,
+    # authorisation), all of which mean saving/loading is not possible
+    def sheet(self):
+        try:
+            return self.get_sheet()
+        except Exception as e:
+            raise StorageError(
+                f"Could not connect to Google Sheets: {e}") from e
+
+    # Uses 2 requests however many routes there are: creating the sheet
+    # (which also checks the name is unused) and writing all values at once
+    def save(self, save_name, dealt_hand, results_list):
+        # Imported here, as it is slow to import
+        import gspread
+
+        values = saved_routes_values(dealt_hand, results_list)
+        sheet = self.sheet()
+        try:
+            new_sheet = sheet.add_worksheet(
+                title=f"saved_routes_{save_name}",
+                rows=len(values), cols=len(values[0]))
+            new_sheet.update(range_name="A1", values=values)
+        except gspread.exceptions.APIError as e:
+            if "already exists" in str(e):
+                raise SaveNameTaken(save_name) from e
+            raise StorageError(f"An API error occurred: {e}") from e
+
+    # Loads a save with a single request for all of its values
+    def load(self, save_name):
+        # Imported here, as it is slow to import
+        import gspread
+        from gspread.utils import absolute_range_name
+
+        sheet_name = f"saved_routes_{save_name}"
+        sheet = self.sheet()
+        try:
+            response = sheet.values_get(
+                absolute_range_name(sheet_name))
+        except gspread.exceptions.APIError as e:
+            # Requesting a sheet that does not exist gives an invalid range
+            if "Unable to parse range" in str(e):
+                raise SaveNotFound(save_name) from e
+            raise StorageError(f"An API error occurred: {e}") from e
+
+        saved_data = response.get("values", [])
+        if len(saved_data) == 0:
+            raise SaveNotFound(save_name)
+        return parse_saved_routes(saved_data)
+
+
+# Saves are rows of a local SQLite database, looked up by name through the
+# primary key index. Needs no network, and has no limit on number of saves.
+# Use path ":memory:" for a temporary database
+class SQLiteStorage:
+
+    def __init__(self, path="saved_routes.db"):
+        # Saving/loading can happen in a different thread to the one that
+        # created the storage, but never at the same time
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS saved_routes ("
+                "name TEXT PRIMARY KEY, "
+                "entry_cards TEXT NOT NULL, "
+                "town_cards TEXT NOT NULL, "
+                "routes TEXT NOT NULL)")
+
+    def save(self, save_name, dealt_hand, results_list):
+        dealt_hand = [int(card) for card in dealt_hand]
+        routes = [[str(town) for town in route] for route in results_list]
+        try:
+            with self.connection:
+                self.connection.execute(
+                    "INSERT INTO saved_routes VALUES (?, ?, ?, ?)",
+                    (save_name, json.dumps(dealt_hand[0:2]),
+                     json.dumps(dealt_hand[2:]), json.dumps(routes)))
+        except sqlite3.IntegrityError as e:
+            raise SaveNameTaken(save_name) from e
+        except sqlite3.Error as e:
+            raise StorageError(f"A database error occurred: {e}") from e
+
+    def load(self, save_name):
+        try:
+            row = self.connection.execute(
+                "SELECT entry_cards, town_cards, routes FROM saved_routes "
+                "WHERE name = ?", (save_name,)).fetchone()
+        except sqlite3.Error as e:
+            raise StorageError(f"A database error occurred: {e}") from e
+        if row is None:
+            raise SaveNotFound(save_name)
+        saved_entry_cards, saved_town_cards, all_saved_routes = (
+            json.loads(value) for value in row)
+        return (tuple(saved_entry_cards), tuple(saved_town_cards),
+                tuple(tuple(route) for route in all_saved_routes))
+
+
+# Available storage backends, selected by name
+STORAGE_BACKENDS = ["sheets", "sqlite"]
@@ -1,67 +1,127 @@
-import gspread
-from google.oauth2.service_account import Credentials
 import numpy as np
-import networkx as nx
 from timeit import default_timer as timer
 import itertools
 import sys
 import time
 import threading
+import contextlib
 import os
 import re
+import functools
+import route_solver
+import route_storage
+import board_cache
+import sheets
+from solution_cache import SolutionCache
 from colorama import Fore, Back, Style, init
-init(autoreset=True)
 
+# Colour is left out when output is not to a terminal (e.g. piped to a
+# file), or with --no-colour or the NO_COLOR environment variable
+COLOUR = sys.stdout.isatty() and not (
+    "--no-colour" in sys.argv or "NO_COLOR" in os.environ)
+init(autoreset=True, strip=None if COLOUR else True)
+
+
+# Shows word followed by 1, 2 and 3 dots in turn while the code inside a
+# with block runs, e.g.
+#   with progress.show("  Saving route/s"):
+#       ...
+# The animation stops as soon as the block ends, and its thread is finished
+# before the code after the block carries on. If update(fraction) is called
+# during the block (e.g. by the solver), the percentage done is shown
+# instead of dots
+class ProgressReporter:
+
+    def __init__(self, interval=0.3):
+        self.interval = interval
+        self.done = threading.Event()
+        self.fraction = None
+
+    @contextlib.contextmanager
+    def show(self, word):
+        self.done.clear()
+        self.fraction = None
+        animation = threading.Thread(target=self.animate, args=(word,),
+                                     daemon=True)
+        animation.start()
+        try:
+            yield self
+        finally:
+            self.done.set()
+            animation.join()
+
+    def update(self, fraction):
+        self.fraction = fraction
+
+    def animate(self, word):
+        print()
+        print()
+        for dots in itertools.cycle(
+                ["       ", " .     ", " . .   ", " . . . "]):
+            if self.fraction is not None:
+                dots = " {:>4.0%}  ".format(self.fraction)
+            sys.stdout.write(f"\r{word}" + dots)
+            sys.stdout.flush()
+            if self.done.wait(self.interval):
+                break
 
-# Define global varibale used in loading_animation
-solver_ready = False
 
+# Animation happens concurrent with rest of code loading/thinking
+progress = ProgressReporter()
 
-# Cycles between 1, 2 and 3 dots printed after word
-def loading_dots(word):
-    print()
-    print()
-    for dots in itertools.cycle(["       ", " .     ", " . .   ", " . . . "]):
-        if solver_ready:
-            break
-        sys.stdout.write(f"\r{word}" + dots)
-        sys.stdout.flush()
-        time.sleep(0.3)
+
+# When this process started, as a timer() value, so that interpreter
+# start-up and module imports (including time waiting on the disk) are
+# counted. Uses the start time Linux records for every process; elsewhere
+# falls back to the CPU time used so far
+def process_start_time():
+    try:
+        with open("/proc/self/stat", "r") as file:
+            start_ticks = int(file.read().rsplit(")", 1)[1].split()[19])
+        uptime = time.clock_gettime(time.CLOCK_BOOTTIME)
+        return timer() - (uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, AttributeError, IndexError, ValueError):
+        return timer() - time.process_time()
 
 
-# Animation happens concurrent with rest of code loading/thinking
-def play_loading_animation(word):
-    loading_animation = threading.Thread(target=loading_dots, args=(word,))
-    loading_animation.start()
-    return loading_animation
+# Interpreter start-up and module imports
+startup_start = process_start_time()
+startup_times = {"imports": timer() - startup_start}
 
+# Print timings for each stage of startup with --startup-profile
+STARTUP_PROFILE = "--startup-profile" in sys.argv
 
-# Loading prints on program startup
-loading_animation = play_loading_animation(" Loading")
+# Print the time taken by each phase of calculating routes with --profile
+PROFILE = "--profile" in sys.argv
 
-# Setting up API from Google Sheet
-SCOPE = [
-    "https://www.googleapis.com/auth/spreadsheets",
-    "https://www.googleapis.com/auth/drive.file",
-    "https://www.googleapis.com/auth/drive"
-]
+# Time (seconds) the banner should appear within. Reported by --startup-profile
+STARTUP_BUDGET = float(os.environ.get("STARTUP_BUDGET", "0.5"))
 
-CREDS = Credentials.from_service_account_file("creds.json")
-SCOPED_CREDS = CREDS.with_scopes(SCOPE)
-GSPREAD_CLIENT = gspread.authorize(SCOPED_CREDS)
-SHEET = GSPREAD_CLIENT.open("discovering_ireland")
+# Where routes are saved: "sheets" (a worksheet per save in the Google
+# Sheet) or "sqlite" (a local database at SQLITE_PATH). Set up by setup()
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "sheets")
+if STORAGE_BACKEND not in route_storage.STORAGE_BACKENDS:
+    sys.exit("STORAGE_BACKEND must be one of " +
+             ", ".join(route_storage.STORAGE_BACKENDS) + ".")
+storage = None
 
-# Extracting data from counted_distances worksheet
-distance_data = SHEET.worksheet("counted_distances")
-counted_distances = distance_data.get_all_values()
 
-# Convert values from counted_distances to a NumPy array with integer values
-edge_weights_matrix = np.array(counted_distances, dtype=np.int32)
+def set_up_storage():
+    if STORAGE_BACKEND == "sqlite":
+        return route_storage.SQLiteStorage(
+            os.environ.get("SQLITE_PATH", "saved_routes.db"))
+    return route_storage.SheetsStorage(sheets.get_sheet)
 
-# Extracting town names from town_names, convert to list of strings
-town_data = SHEET.worksheet("town_names")
-town_names = town_data.get_all_values()
-town_names = [town[0] for town in town_names]
+
+# Set REFRESH_BOARD_CACHE to re-read the board from Google Sheets, even when
+# a cached copy exists. The cache is only rebuilt if the sheet has changed
+REFRESH_BOARD_CACHE = os.environ.get("REFRESH_BOARD_CACHE") is not None
+
+
+# The game board (a route_solver.Board), and where it was read from
+# ("cache" or "Google Sheets"). Loaded by setup()
+board = None
+board_source = None
 
 # Getting value of MAX_NUMBER_OF_TOWNS from environment variables
 MAX_NUMBER_OF_TOWNS = os.environ.get("MAX_NUMBER_OF_TOWNS")
@@ -75,19 +135,52 @@ else:
     # If MAX_NUMBER_OF_TOWNS is not set, set town_limit to False
     town_limit = False
 
-
-# Getting number of Town Cards from length of town_names
-number_of_towns = len(town_names)
-
-# Construct list of all cards, labelled by their corresponding numbers
-all_cards = list(range(1, number_of_towns + 1))
-
-# List of all Entry/Exit Cards. Must be manually enterred
-entry_cards = [
-    5, 9, 31, 39, 47, 50
-]
-# List of all Town Cards, which is all_cards with entry_cards removed
-town_cards = [i for i in all_cards if i not in entry_cards]
+# Getting solver used by calculate_route from environment variables.
+# "permutations" is the original brute-force search, kept for cross-checking
+SOLVER_METHOD = os.environ.get("SOLVER_METHOD", "held-karp")
+if SOLVER_METHOD not in route_solver.SOLVERS:
+    sys.exit("SOLVER_METHOD must be one of " +
+             ", ".join(sorted(route_solver.SOLVERS)) + ".")
+
+# Optional time limit (seconds) for solvers that can return their best route
+# so far, e.g. SOLVER_METHOD=branch-and-bound
+SOLVER_TIME_LIMIT = os.environ.get("SOLVER_TIME_LIMIT")
+if SOLVER_TIME_LIMIT is not None:
+    SOLVER_TIME_LIMIT = float(SOLVER_TIME_LIMIT)
+
+# Number of processes used by solvers that can search in parallel
+SOLVER_WORKERS = int(os.environ.get("SOLVER_WORKERS", "1"))
+
+# Recently solved hands are remembered, so solving one again is instant.
+# SOLUTION_CACHE_TTL (seconds) limits how long a hand is remembered, and
+# SOLUTION_CACHE_PATH keeps the cache in a file between runs
+SOLUTION_CACHE_TTL = os.environ.get("SOLUTION_CACHE_TTL")
+if SOLUTION_CACHE_TTL is not None:
+    SOLUTION_CACHE_TTL = float(SOLUTION_CACHE_TTL)
+solution_cache = None
+
+# Also show routes a little longer than the optimal route/s: the
+# NEAR_OPTIMAL_ROUTES shortest of them and/or every one at most
+# NEAR_OPTIMAL_SLACK longer than optimal. Off unless either is set
+NEAR_OPTIMAL_ROUTES = os.environ.get("NEAR_OPTIMAL_ROUTES")
+if NEAR_OPTIMAL_ROUTES is not None:
+    NEAR_OPTIMAL_ROUTES = int(NEAR_OPTIMAL_ROUTES)
+    if NEAR_OPTIMAL_ROUTES < 1:
+        sys.exit("NEAR_OPTIMAL_ROUTES must be at least 1.")
+NEAR_OPTIMAL_SLACK = os.environ.get("NEAR_OPTIMAL_SLACK")
+if NEAR_OPTIMAL_SLACK is not None:
+    NEAR_OPTIMAL_SLACK = int(NEAR_OPTIMAL_SLACK)
+    if NEAR_OPTIMAL_SLACK < 0:
+        sys.exit("NEAR_OPTIMAL_SLACK must not be negative.")
+
+# Number of processes solving hands at the same time for a whole table, and
+# most players a table can have. Only hands large enough to take a while
+# (route_solver.HEAVY_CARD_COUNTS) are sent to other processes
+TABLE_WORKERS = int(os.environ.get("TABLE_WORKERS", "1"))
+TABLE_MAX_PLAYERS = 6
+
+# List of all Entry/Exit Cards. Must be manually enterred (in route_solver)
+entry_cards = route_solver.ENTRY_CARDS
 
 # Declare assigned card variables in global scope
 assigned_town_cards = []
@@ -126,24 +219,6 @@ instructions_3 = "   Town Cards: All other numbers from 1 to 52\n"
 
 instructions_4 = " Enjoy, and good luck!\n"
 
-# Nodes: town_cards, entry_cards. Edge weights: counted_distances.csv
-graph = nx.from_numpy_array(edge_weights_matrix)
-
-# Reindexing so that town number matches index
-graph = nx.convert_node_labels_to_integers(graph, 1)
-
-# Lists all pairs of nodes; length of path between them; route taken.
-distances = []
-all_shortest_paths = []
-for i in graph.nodes:
-    for j in graph.nodes:
-        all_shortest_paths.append(nx.shortest_path(
-            graph, source=i, target=j, weight="weight"))
-        distances.append(nx.shortest_path_length(graph, i, j, weight="weight"))
-
-# Reshape distances into a square array.
-distances = np.reshape(distances, newshape=(len(all_cards), len(all_cards)))
-
 # List acceptable inputs when YES or NO should be provided.
 yes_inputs = ["yes", "ye", "y"]
 no_inputs = ["no", "n"]
@@ -151,8 +226,6 @@ no_inputs = ["no", "n"]
 # Possible error messages. Written here due to exceeding line length
 min_entry = min(entry_cards)
 max_entry = max(entry_cards)
-min_town = min(town_cards)
-max_town = max(town_cards)
 enter_entry = """
   Please enter your Entry/Exit Cards, separated by a space:
     """
@@ -165,10 +238,6 @@ invalid_entry_between = (
     f"\n  Invalid input. Input musts be between"
     f" {min_entry} and {max_entry} (inclusive)."
 )
-invalid_town_between = (
-    f"\n  Invalid input. Inputs must be between"
-    f" {min_town} and {max_town} (inclusive)."
-)
 invalid_entry_not_town = """
   Invalid input. Please enter only your Entry/Exit Cards.
   Do not include any Town Cards."""
@@ -187,6 +256,11 @@ def validate_inputs():
 
     global assigned_town_cards, assigned_entry_cards
 
+    invalid_town_between = (
+        f"\n  Invalid input. Inputs must be between"
+        f" {min(board.town_cards)} and {max(board.town_cards)} (inclusive)."
+    )
+
     # Get input from the user as a space-separated string
     input_entry = input(Fore.YELLOW + Style.BRIGHT + enter_entry)
 
@@ -199,7 +273,7 @@ def validate_inputs():
                 card_is_entry = all(
                     c in entry_cards for c in assigned_entry_cards)
                 valid_entry = all(
-                    c in all_cards for c in assigned_entry_cards)
+                    c in board.all_cards for c in assigned_entry_cards)
             else:
                 print(Fore.RED + Style.BRIGHT + invalid_spaces_intergers)
                 raise ValueError(
@@ -235,9 +309,9 @@ def validate_inputs():
             if all(value.isdigit() for value in input_town):
                 assigned_town_cards = [int(card) for card in input_town]
                 card_is_town = all(
-                    c in town_cards for c in assigned_town_cards)
+                    c in board.town_cards for c in assigned_town_cards)
                 valid_town = all(
-                    c in all_cards for c in assigned_town_cards)
+                    c in board.all_cards for c in assigned_town_cards)
             else:
                 print(Fore.RED + Style.BRIGHT + invalid_spaces_intergers)
                 raise ValueError("Invalid input format")
@@ -308,7 +382,8 @@ def too_many_cards():
         f" restart the program, enter 2:\n    "
     )
     if (not town_limit):
-        if len(assigned_town_cards) <= 9:
+        if len(assigned_town_cards) <= (
+                route_solver.SOLVER_CARD_LIMITS[SOLVER_METHOD]):
             return "continue"
         else:
             while True:
@@ -336,79 +411,39 @@ def too_many_cards():
 
 
 def calculate_route():
-    global solver_ready
     # Start timer
     start = timer()
 
-    # Start loading_animation
-    solver_ready = False
-    loading_animation = play_loading_animation("  Calculating route/s")
-
-    # List all permutations of assigned_town_cards
-    possible_town_routes = list(itertools.permutations(assigned_town_cards))
-
-    # Create start and end card arrays
-    start_entry = np.full((len(possible_town_routes), 1),
-                          assigned_entry_cards[0])
-    end_entry = np.full((len(possible_town_routes), 1),
-                        assigned_entry_cards[1])
-
-    # Stacking the previous to get all possible valid routes
-    all_routes = np.hstack(
-        (start_entry, possible_town_routes, end_entry))
+    # Connect to Google Sheet in the background, in case route/s are saved
+    if STORAGE_BACKEND == "sheets":
+        sheets.start_sheet_connection()
 
-    # Calculate total route length for each route
-    route_lengths = []
-    for i in range(all_routes.shape[0]):
-        for j in range(all_routes.shape[1]-1):
-            route_lengths.append(
-                distances[all_routes[i, j]-1, all_routes[i, (j+1)]-1])
-
-    # Reshaping route lengths into an array, one row for each route
-    route_lengths = np.reshape(route_lengths, newshape=(
-        (all_routes.shape[0]), all_routes.shape[1]-1))
-
-    # Summing each row to get route length for each route
-    route_lengths = np.sum(route_lengths, axis=1)
-
-    # Finding the minimum route length, and its corresponding index
-    min_length = np.min(route_lengths)
-    min_indices = [i for i, x in enumerate(route_lengths) if x == min_length]
-
-    # Find shortest route/s in all_routes using min_indicies
-    routes_to_take = []
-    for i in range(len(min_indices)):
-        routes_to_take.append(all_routes[min_indices[i]])
-
-    routes_to_take = np.asarray(routes_to_take)
-
-    # Stop loading_animation
-    solver_ready = True
+    # Find the optimal route length and all routes of that length, showing
+    # how far through the search the solver is
+    profile = route_solver.SolveProfile(on_progress=progress.update)
+    with progress.show("  Calculating route/s"):
+        solution = board.solve(
+            assigned_entry_cards, assigned_town_cards, method=SOLVER_METHOD,
+            time_limit=SOLVER_TIME_LIMIT, workers=SOLVER_WORKERS,
+            cache=solution_cache, profile=profile)
 
     # Printing the route length for the/se route/s
     print("\n\n\n  Optimal route length:")
-    print("  ", Style.BRIGHT + str(route_lengths[min_indices[0]]))
-
-    # Compile all towns visited from all_shortest_paths and routes_to_take
-    results_list = [[assigned_entry_cards[0]] for _ in range(len(min_indices))]
-    for i in range(len(min_indices)):
-        for j in range(len(routes_to_take[i])-1):
-            # .copy() used so that no changes are made to all_shortest_paths
-            next_result = all_shortest_paths[(
-                (routes_to_take[i][j] - 1) * len(all_cards)) + (
-                    routes_to_take[i][j+1] - 1)].copy()
-            # pop(0) to remove starting town, to avoid duplication in list
-            next_result.pop(0)
-            results_list[i] += next_result
-
-    # Remove instances where card order is different but route is same
-    remove_duplicate_routes(results_list)
-
-    # Remove symmetrical route if both Entry/Exit cards are the same
-    remove_symmetrical_routes(results_list)
+    print("  ", Style.BRIGHT + str(solution.length))
+    if not solution.proven_optimal:
+        print(Fore.RED + Style.BRIGHT +
+              "  Time limit reached. This is the shortest route found so"
+              " far,\n  but a shorter route may exist.")
+
+    # All towns visited, with duplicate and symmetrical routes removed
+    results_list = solution.towns_visited
 
     print("\n  Optimal route/s for dealt cards: ")
-    print_coloured_routes(results_list, assigned_town_cards)
+    with profile.phase("print routes"):
+        print_coloured_routes(results_list, assigned_town_cards)
+
+    if NEAR_OPTIMAL_ROUTES is not None or NEAR_OPTIMAL_SLACK is not None:
+        print_near_optimal_routes(solution.length, profile)
 
     end = timer()
 
@@ -417,6 +452,8 @@ def calculate_route():
 
     print("\n  Time taken to calculate route/s:")
     print("  ", time_taken, "seconds\n")
+    if PROFILE:
+        print_solve_profile(profile, end - start)
     print("  ", Back.WHITE + Fore.BLACK +
           " Scroll up to see your optimal route/s! ")
 
@@ -438,54 +475,111 @@ def calculate_route():
                   "  Invalid input. Please type YES or NO:\n    ")
 
 
-def remove_duplicate_routes(routes):
-    for i in range(len(routes)-1, 0, -1):
-        for j in range(len(routes)-2, -1, -1):
-            if (i > j and routes[i] == routes[j]):
-                del routes[i]
+# Routes longer than the shortest, within NEAR_OPTIMAL_ROUTES and
+# NEAR_OPTIMAL_SLACK
+def print_near_optimal_routes(min_length, profile):
+    solutions = board.near_optimal(
+        assigned_entry_cards, assigned_town_cards, k=NEAR_OPTIMAL_ROUTES,
+        slack=NEAR_OPTIMAL_SLACK, time_limit=SOLVER_TIME_LIMIT,
+        profile=profile, longer_than=min_length)
+
+    print("\n\n  Next shortest route/s for dealt cards: ")
+    if len(solutions) == 0:
+        print("\n    None found.")
+    with profile.phase("print routes"):
+        print_coloured_routes(
+            [solution.towns_visited[0] for solution in solutions],
+            assigned_town_cards,
+            lengths=[solution.length for solution in solutions])
+
+
+# Reads every player's hand, then solves them all at once and shows each
+# player's optimal route length side by side
+def solve_table():
+    number_of_players = None
+    while number_of_players is None:
+        players_input = input(
+            f"\n  How many players are at the table? Please enter a number"
+            f" from 1 to {TABLE_MAX_PLAYERS}:\n    ")
+        if players_input.strip().isdigit() and (
+                1 <= int(players_input) <= TABLE_MAX_PLAYERS):
+            number_of_players = int(players_input)
+        else:
+            print(Fore.RED + Style.BRIGHT + "\n  Invalid input.")
+
+    hands = []
+    for player in range(1, number_of_players + 1):
+        while True:
+            print(Style.RESET_ALL)
+            print(Back.WHITE + Fore.BLACK + f"  Player {player} ")
+            validate_inputs()
+            print_cards()
+            if check_cards() and too_many_cards() == "continue":
                 break
+        hands.append((assigned_entry_cards, assigned_town_cards))
 
+    # Start timer
+    start = timer()
 
-def remove_symmetrical_routes(routes):
-    if assigned_entry_cards[0] == assigned_entry_cards[1]:
-        for i in range(len(routes)-1, 0, -1):
-            for j in range(i-1, -1, -1):
-                reversed_route = list(reversed(routes[i]))
-                if reversed_route == routes[j]:
-                    del routes[i]
-                    break
+    with progress.show("  Calculating route/s"):
+        solutions = board.solve_table(
+            hands, method=SOLVER_METHOD, time_limit=SOLVER_TIME_LIMIT,
+            workers=TABLE_WORKERS, cache=solution_cache)
 
+    end = timer()
 
-# Saves dealt hand and shortest route/s to new sheet
-def save_routes_to_new_sheet(save_name, dealt_hand, results_list):
+    print("\n\n\n  Optimal route lengths:\n")
+    print(Style.BRIGHT + "    {:<8}{:<16}{:<10}{}".format(
+        "Player", "Entry/Exit", "Length", "Time (seconds)"))
+    for player, solution in enumerate(solutions, start=1):
+        length = str(solution.length)
+        if not solution.proven_optimal:
+            length += "*"
+        print("    {:<8}{:<16}{:<10}{:.5f}".format(
+            player, str(solution.entry_cards), length,
+            solution.time_taken))
+    if not all(solution.proven_optimal for solution in solutions):
+        print(Fore.RED + Style.BRIGHT +
+              "\n  * Time limit reached. A shorter route may exist.")
 
-    # Create a new sheet for each save
-    new_sheet = SHEET.add_worksheet(title=f"saved_routes_{save_name}",
-                                    rows=100, cols=(len(results_list) + 1))
+    # Time taken shown in seconds to 5sf
+    print("\n  Time taken to calculate all route/s:")
+    print("  ", round(end - start, 5), "seconds")
+    print("  ", round(sum(solution.time_taken for solution in solutions), 5),
+          "seconds if solved one hand at a time\n")
 
-    # Write dealt hand to the first column
-    new_sheet.update(range_name="A1", values=[["Dealt Hand"]])
-    dealt_hand_column = [[str(card)] for card in dealt_hand]
-    new_sheet.update(range_name=f"A2:A{len(dealt_hand_column) + 1}",
-                     values=dealt_hand_column)
+    while True:
+        show_choice = input(
+            "\n  Would you like to see each player's route/s?"
+            "\n  Please type YES or NO:\n    ")
+        if show_choice.lower() in yes_inputs:
+            for player, solution in enumerate(solutions, start=1):
+                print("\n\n  " + Back.WHITE + Fore.BLACK +
+                      f" Player {player} ")
+                print_coloured_routes(solution.towns_visited,
+                                      solution.town_cards)
+            break
+        elif show_choice.lower() in no_inputs:
+            break
 
-    # Write routes to following columns
-    for i in range(len(results_list)):
-        # Using ASCII Unicode to translate index into corresponding column
-        column_index = chr(ord('B') + i)
-        title_range = f"{column_index}1"
-        route_name = f"Route {i+1}"
-        new_sheet.update(range_name=title_range, values=[[route_name]])
 
-        route_towns_column = [[str(town)] for town in results_list[i]]
-        start_cell = f"{column_index}2"
-        end_cell = f"{column_index}{len(results_list[i]) + 1}"
-        entries_range = f"{start_cell}:{end_cell}"
-        new_sheet.update(range_name=entries_range, values=route_towns_column)
+# Saves dealt hand and shortest route/s using the storage backend. Returns
+# True once saved, False if a save already exists with this name, or None
+# if the route/s could not be saved at all (e.g. no connection), after
+# saying why
+def save_routes_to_new_sheet(save_name, dealt_hand, results_list):
+    try:
+        storage.save(save_name, dealt_hand, results_list)
+    except route_storage.SaveNameTaken:
+        return False
+    except route_storage.StorageError as e:
+        print("\n")
+        print(Fore.RED + Style.BRIGHT + f"\n  {e}")
+        return None
+    return True
 
 
 def save_route_with_name(dealt_hand, results_list):
-    global solver_ready
     while True:
         save_name = input(f"\n  Please enter a name to"
                           f" save your route/s under:\n    ")
@@ -494,113 +588,93 @@ def save_route_with_name(dealt_hand, results_list):
             print(Fore.RED + Style.BRIGHT +
                    "\n  Invalid name. Name must not start or end with a space.")
             continue
-        # Start loading_animation
-        solver_ready = False
-        loading_animation = play_loading_animation("  Saving route/s")
-        # Get list of existing save names
-        existing_saves = [saved.title for saved in SHEET.worksheets()]
-        if f"saved_routes_{save_name}" in existing_saves:
-            # Stop loading_animation
-            solver_ready = True
+        with progress.show("  Saving route/s"):
+            saved = save_routes_to_new_sheet(
+                save_name, dealt_hand, results_list)
+        if saved is None:
+            break  # Back to the menu, as trying other names will not help
+        elif not saved:
             print(Fore.RED + Style.BRIGHT +
                   "\n\n  Saved route/s already exist with this name.")
             continue
         else:
-            save_routes_to_new_sheet(save_name, dealt_hand, results_list)
-            # Stop loading_animation
-            solver_ready = True
             print(Style.BRIGHT +
                   f"\n\n\n  Route/s saved with name: '{save_name}'.\n")
             break  # Breaks once a unique name is entered
 
 
+# Saves are never changed once written, so loaded saves are kept in memory
+# for repeated loads. Saves that are not found are not cached
+@functools.lru_cache(maxsize=32)
+def load_saved_routes(load_name):
+    return storage.load(load_name)
+
+
 def recall_routes_by_save_name():
-    global solver_ready
     load_name = input(f"\n  Enter the name used to"
                       f" save your calculated route/s:\n    ")
-    # Start loading_animation
-    solver_ready = False
-    loading_animation = play_loading_animation("  Loading route/s")
     try:
-        saved_sheet = SHEET.worksheet(f"saved_routes_{load_name}")
-        saved_data = saved_sheet.get_all_values()
-        if len(saved_data) == 0:
-            # Stop loading_animation
-            solver_ready = True
-            print(Fore.RED + Style.BRIGHT +
-                  f"  No saved route/s found with the name '{load_name}'.")
-            return
-        else:
-            # Separate Entry/Exit and Town Cards
-            saved_dealt = saved_sheet.col_values(1)
-            saved_entry_cards = saved_dealt[1:3]
-            saved_entry_cards = [int(card) for card in saved_entry_cards]
-            saved_town_cards = saved_dealt[3:(len(saved_dealt))]
-            saved_town_cards = [int(card) for card in saved_town_cards]
-
-            # Get the values from the second column onward
-            all_saved_routes = []
-
-            # Iterate over each column, starting from column B
-            for i in range(2, saved_sheet.col_count + 1):
-                next_route = saved_sheet.col_values(i)
-                # Remove the header
-                next_route = next_route[1:]
-                all_saved_routes.append(next_route)
-
-            # Stop loading_animation
-            solver_ready = True
-            print("\n\n\n  Saved route/s for name:",
-                  Back.WHITE + Fore.BLACK + f" {load_name} ")
-            print("\n  Entry/Exit Cards:")
-            print("  ", Fore.YELLOW + Style.BRIGHT + str(saved_entry_cards))
-            print("\n  Town Cards:")
-            print("  ", Fore.GREEN + Style.BRIGHT + str(saved_town_cards))
-            print_coloured_routes(all_saved_routes, saved_town_cards)
-            print("\n")
-            print("  ", Back.WHITE + Fore.BLACK +
-                  " Scroll up to see your loaded route/s! ")
-            print()
-            input("                            Press ENTER to continue\n")
-            return
-
-    except gspread.exceptions.WorksheetNotFound:
-        # Stop loading_animation
-        solver_ready = True
+        with progress.show("  Loading route/s"):
+            saved_entry_cards, saved_town_cards, all_saved_routes = (
+                load_saved_routes(load_name))
+    except route_storage.SaveNotFound:
         print("\n")
         print(Fore.RED + Style.BRIGHT +
               f"  No saved route/s found with the name '{load_name}'.")
-
-    except gspread.exceptions.APIError as e:
-        # Stop loading_animation
-        solver_ready = True
+        return
+    except route_storage.StorageError as e:
         print("\n")
-        print(Fore.RED + Style.BRIGHT + f"\n  An API error occurred: {e}")
-
-
-def print_coloured_routes(routes, relevant_towns_list):
-
-    for i in range(len(routes)):
-        a_copy = relevant_towns_list.copy()
-        print("\n\n    " +
-              Back.WHITE + Fore.BLACK + " Route " +
-              Back.WHITE + Fore.BLACK + str(i + 1) +
-              Back.WHITE + Fore.BLACK + " ", "\n")
-        for j in range(len(routes[i])):
-            town = int(routes[i][j])
-            if j == 0 or j == (len(routes[i]) - 1):
-                print(Fore.YELLOW + Style.BRIGHT +
-                      "    {:>2} : {}".format(town, town_names[town - 1]))
-                a_copy = [
-                    card for card in a_copy if card != town]
-            elif (town in a_copy):
-                print(Fore.GREEN + Style.BRIGHT +
-                      "    {:>2} : {}".format(town, town_names[town - 1]))
-                a_copy = [
-                    card for card in a_copy if card != town]
+        print(Fore.RED + Style.BRIGHT + f"\n  {e}")
+        return
+
+    saved_entry_cards = list(saved_entry_cards)
+    saved_town_cards = list(saved_town_cards)
+
+    print("\n\n\n  Saved route/s for name:",
+          Back.WHITE + Fore.BLACK + f" {load_name} ")
+    print("\n  Entry/Exit Cards:")
+    print("  ", Fore.YELLOW + Style.BRIGHT + str(saved_entry_cards))
+    print("\n  Town Cards:")
+    print("  ", Fore.GREEN + Style.BRIGHT + str(saved_town_cards))
+    print_coloured_routes(all_saved_routes, saved_town_cards)
+    print("\n")
+    print("  ", Back.WHITE + Fore.BLACK +
+          " Scroll up to see your loaded route/s! ")
+    print()
+    input("                            Press ENTER to continue\n")
+
+
+# Entry/Exit Cards are shown in yellow, and the first visit to each of
+# relevant_towns_list in green. With lengths, the length of each route is
+# shown next to its number. All routes are written at once, rather than one
+# print per town, as each write can be sent separately to a web terminal
+def print_coloured_routes(routes, relevant_towns_list, lengths=None):
+    sys.stdout.write(render_routes(routes, relevant_towns_list, lengths))
+    sys.stdout.flush()
+
+
+def render_routes(routes, relevant_towns_list, lengths=None, colour=COLOUR):
+    header = Back.WHITE + Fore.BLACK if colour else ""
+    entry = Fore.YELLOW + Style.BRIGHT if colour else ""
+    relevant = Fore.GREEN + Style.BRIGHT if colour else ""
+    reset = Style.RESET_ALL if colour else ""
+
+    lines = []
+    for i, route in enumerate(routes):
+        not_visited = set(relevant_towns_list)
+        length = "" if lengths is None else f"(length {lengths[i]}) "
+        lines.append(f"\n\n    {header} Route {i + 1} {length}{reset} \n\n")
+        for j, town in enumerate(route):
+            town = int(town)
+            line = "    {:>2} : {}".format(town, board.town_names[town - 1])
+            if j == 0 or j == len(route) - 1:
+                lines.append(entry + line + reset + "\n")
+            elif town in not_visited:
+                not_visited.discard(town)
+                lines.append(relevant + line + reset + "\n")
             else:
-                print("    {:>2} : {}".format(
-                    town, town_names[town-1]))
+                lines.append(line + "\n")
+    return "".join(lines)
 
 
 def print_banner():
@@ -619,11 +693,40 @@ def print_goodbye():
     goodbye.close()
 
 
-def instructions_prompt():
-    global solver_ready
+# Prints how long each stage of startup took, with --startup-profile
+def print_startup_profile():
+    total = startup_times["banner"]
+    print(Style.RESET_ALL)
+    print("  Startup profile:")
+    print("    Interpreter and imports: {:.4f} seconds".format(
+        startup_times["imports"]))
+    print("    Board ({}): {:.4f} seconds".format(
+        board_source, startup_times["board"]))
+    print("    Banner shown after: {:.4f} seconds".format(total))
+    if total <= STARTUP_BUDGET:
+        print(Fore.GREEN + Style.BRIGHT +
+              f"    Within startup budget of {STARTUP_BUDGET} seconds")
+    else:
+        print(Fore.RED + Style.BRIGHT +
+              f"    Exceeds startup budget of {STARTUP_BUDGET} seconds")
+
+
+# Time taken by each phase of calculate_route, and the work done
+def print_solve_profile(profile, total):
+    print("  Profile:")
+    for name, seconds in profile.phases.items():
+        print("    {:<20} {:.5f} seconds ({:.0%})".format(
+            name, seconds, seconds / total if total > 0 else 0))
+    for name, value in profile.counters.items():
+        print("    {:<20} {}".format(name, value))
+    for name, value in profile.peaks.items():
+        print("    {:<20} {}".format(name, value))
+    print()
+
 
-    # Stop loading_animation
-    solver_ready = True
+def instructions_prompt():
+    if STARTUP_PROFILE:
+        print_startup_profile()
 
     input(welcome_message)
 
@@ -634,7 +737,9 @@ def options_prompt():
                       f"          1. View Instructions\n"
                       f"          2. Find your shortest route\n"
                       f"          3. Load previously saved route/s\n"
-                      f"          4. Exit solver\n\n"
+                      f"          4. Find shortest routes for a whole"
+                      f" table\n"
+                      f"          5. Exit solver\n\n"
                       f"  Please type the number corresponding to"
                       f" your choice, followed by ENTER:\n    ")
 
@@ -653,18 +758,38 @@ def options_prompt():
             elif welcome_choice == "3":
                 return "three"
             elif welcome_choice == "4":
+                return "four"
+            elif welcome_choice == "5":
                 break
             else:
                 print(Fore.RED + Style.BRIGHT + "\n  Invalid input.")
                 raise ValueError("Invalid input")
         except Exception:
             print(Fore.RED + Style.BRIGHT +
-                  "\n  Please enter 1, 2, 3 or 4:\n    ")
+                  "\n  Please enter 1, 2, 3, 4 or 5:\n    ")
             continue  # Back to beginning of loop
 
 
 def setup():
+    global storage, board, board_source, solution_cache
+
+    # Loading prints on program startup
+    with progress.show(" Loading"):
+        storage = set_up_storage()
+
+        board_start = timer()
+        board, board_source = board_cache.load_board(
+            sheets.get_sheet, refresh=REFRESH_BOARD_CACHE)
+        startup_times["board"] = timer() - board_start
+
+        solution_cache = SolutionCache(
+            max_size=int(os.environ.get("SOLUTION_CACHE_SIZE", "1024")),
+            ttl=SOLUTION_CACHE_TTL,
+            path=os.environ.get("SOLUTION_CACHE_PATH"),
+            board_hash=board.source_hash)
+
     print_banner()
+    startup_times["banner"] = timer() - startup_start
     instructions_prompt()
 
 
@@ -690,7 +815,8 @@ def solver():
         recall_routes_by_save_name()
         solver()
     elif choice == "four":
-        pass
+        solve_table()
+        solver()
 
 
 def run_program():
@@ -699,4 +825,5 @@ def run_program():
     print_goodbye()
 
 
-run_program()
+if __name__ == "__main__":
+    run_program()
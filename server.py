@@ -0,0 +1,226 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+import batch
+import board_cache
+import route_solver
+import sheets
+
+
+# Serves route solving over HTTP, so the board is loaded and its shortest
+# paths computed once rather than for every player, e.g.
+#   python3 server.py --port 8000 --workers 4
+#   curl -d '{"entry_cards": [5, 47], "town_cards": [3, 14, 25]}' \
+#       http://localhost:8000/solve
+# The body of POST /solve is a JSON object with entry_cards and town_cards,
+# and optionally method and time_limit (seconds). The response is the same
+# as one line of batch.py output, along with the method used. time_limit
+# only applies to anytime methods (branch-and-bound): the other methods are
+# only used for hands within their SOLVER_CARD_LIMITS, which they solve
+# exactly in well under MAX_TIME_LIMIT.
+# Hands with up to LIGHT_TOWNS Town Cards for their method are solved
+# straight away, larger hands in a pool of worker processes, so that long
+# solves do not hold up short ones
+
+
+# Most Town Cards each method can solve in a couple of milliseconds or less,
+# short enough to solve on the event loop. Larger hands take from several
+# milliseconds (e.g. 21ms for 8 cards with permutations) to seconds
+LIGHT_TOWNS = {
+    "held-karp": 10,
+    "branch-and-bound": 6,
+    "permutations": 6,
+}
+
+# Longest time (seconds) any request may spend solving. Hands too large for
+# the chosen method to solve exactly are solved with an anytime solver
+# within this limit, in place of the MAX_NUMBER_OF_TOWNS prompt of run.py
+MAX_TIME_LIMIT = float(os.environ.get("SERVER_MAX_TIME_LIMIT", "10"))
+
+# Largest request body accepted, in bytes
+MAX_BODY_SIZE = 64 * 1024
+
+# Solves larger hands. Created by serve()
+executor = None
+
+
+class RequestError(Exception):
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# Reads the hand from a request body, choosing the method and time limit
+def parse_hand(body):
+    try:
+        hand = json.loads(body)
+    except ValueError:
+        raise RequestError(HTTPStatus.BAD_REQUEST, "Body must be JSON.")
+    if not isinstance(hand, dict):
+        raise RequestError(HTTPStatus.BAD_REQUEST,
+                           "Body must be a JSON object.")
+
+    for name in ["entry_cards", "town_cards"]:
+        if not isinstance(hand.get(name), list):
+            raise RequestError(HTTPStatus.BAD_REQUEST,
+                               f"{name} must be a list of card numbers.")
+
+    method = hand.get("method", "held-karp")
+    if not isinstance(method, str) or method not in route_solver.SOLVERS:
+        raise RequestError(HTTPStatus.BAD_REQUEST,
+                           "method must be one of " +
+                           ", ".join(sorted(route_solver.SOLVERS)) + ".")
+
+    # json.loads accepts NaN and Infinity, which would never time out, and
+    # true/false are ints to Python
+    time_limit = hand.get("time_limit", MAX_TIME_LIMIT)
+    if (not isinstance(time_limit, (int, float)) or
+            isinstance(time_limit, bool) or
+            not math.isfinite(time_limit) or time_limit <= 0):
+        raise RequestError(HTTPStatus.BAD_REQUEST,
+                           "time_limit must be a positive number.")
+    time_limit = min(time_limit, MAX_TIME_LIMIT)
+
+    # Too many Town Cards to solve exactly in time, so use an anytime
+    # solver and return the best route found within the time limit
+    if (len(hand["town_cards"]) > route_solver.SOLVER_CARD_LIMITS[method] and
+            method not in route_solver.ANYTIME_SOLVERS):
+        method = route_solver.ANYTIME_SOLVERS[0]
+
+    hand.setdefault("id", None)
+    return hand, method, time_limit
+
+
+async def solve(hand, method, time_limit):
+    if len(hand["town_cards"]) <= LIGHT_TOWNS[method]:
+        result = batch.solve_hand(hand, method, time_limit)
+    else:
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(
+            executor, batch.solve_hand, hand, method, time_limit)
+    result["method"] = method
+    return result
+
+
+async def handle_request(method, path, body):
+    if path != "/solve":
+        raise RequestError(HTTPStatus.NOT_FOUND, "Not found.")
+    if method != "POST":
+        raise RequestError(HTTPStatus.METHOD_NOT_ALLOWED,
+                           "Use POST /solve.")
+    result = await solve(*parse_hand(body))
+    if "error" in result:
+        raise RequestError(HTTPStatus.BAD_REQUEST, result["error"])
+    return result
+
+
+async def read_request(reader):
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    try:
+        method, path, version = request_line.decode("latin-1").split()
+    except ValueError:
+        raise RequestError(HTTPStatus.BAD_REQUEST, "Bad request line.")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length", "0"))
+    except ValueError:
+        raise RequestError(HTTPStatus.BAD_REQUEST, "Bad Content-Length.")
+    if length < 0:
+        raise RequestError(HTTPStatus.BAD_REQUEST, "Bad Content-Length.")
+    if length > MAX_BODY_SIZE:
+        raise RequestError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                           "Body too large.")
+    body = await reader.readexactly(length)
+    keep_alive = (version == "HTTP/1.1" and
+                  headers.get("connection", "").lower() != "close")
+    return method, path.split("?")[0], body, keep_alive
+
+
+def write_response(writer, status, content, keep_alive):
+    body = json.dumps(content).encode("utf-8")
+    writer.write(
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+        f"\r\n".encode("latin-1") + body)
+
+
+async def handle_connection(reader, writer):
+    try:
+        while True:
+            try:
+                request = await read_request(reader)
+                if request is None:
+                    break
+                method, path, body, keep_alive = request
+                status, content = HTTPStatus.OK, await handle_request(
+                    method, path, body)
+            except RequestError as e:
+                status, content = e.status, {"error": str(e)}
+                keep_alive = False
+            write_response(writer, status, content, keep_alive)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host, port, workers, cache_dir):
+    global executor
+    executor = ProcessPoolExecutor(max_workers=workers,
+                                   initializer=batch.init_worker,
+                                   initargs=(cache_dir,))
+    server = await asyncio.start_server(handle_connection, host, port)
+    print(f"Serving on http://{host}:{port}/solve")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(
+        description="Serve Discovering Ireland route solving over HTTP.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int,
+                        default=int(os.environ.get("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="number of processes solving larger hands")
+    parser.add_argument("--board-cache", default=board_cache.BOARD_CACHE_DIR,
+                        help="directory of the board cache")
+    arguments = parser.parse_args(arguments)
+
+    # Read from Google Sheets and cached if there is no cached board yet,
+    # so the worker processes can all memory-map the same copy
+    board_cache.load_board(sheets.get_sheet, cache_dir=arguments.board_cache)
+    batch.init_worker(arguments.board_cache)
+
+    try:
+        asyncio.run(serve(arguments.host, arguments.port, arguments.workers,
+                          arguments.board_cache))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
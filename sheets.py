@@ -0,0 +1,59 @@
+import threading
+
+
+# Connection to the Google Sheet holding the board and saved routes, kept
+# apart from run.py so that non-interactive tools (server.py) can connect
+# without importing the terminal program
+
+
+# Setting up API from Google Sheet
+SCOPE = [
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive.file",
+    "https://www.googleapis.com/auth/drive"
+]
+
+# Google Sheet is only connected to when it is needed (saving or loading
+# routes, or reading the board when there is no cached copy). Connection
+# happens in a background thread, so it can start before it is needed
+SHEET = None
+sheet_error = None
+sheet_connection = None
+
+
+def connect_to_sheet():
+    global SHEET, sheet_error
+    try:
+        # Imported here, as they are slow to import and not always needed
+        import gspread
+        from google.oauth2.service_account import Credentials
+
+        CREDS = Credentials.from_service_account_file("creds.json")
+        SCOPED_CREDS = CREDS.with_scopes(SCOPE)
+        GSPREAD_CLIENT = gspread.authorize(SCOPED_CREDS)
+        SHEET = GSPREAD_CLIENT.open("discovering_ireland")
+    except Exception as e:
+        sheet_error = e
+
+
+# Starts connecting to the Google Sheet, if not already started
+def start_sheet_connection():
+    global sheet_connection
+    if sheet_connection is None:
+        sheet_connection = threading.Thread(target=connect_to_sheet,
+                                            daemon=True)
+        sheet_connection.start()
+
+
+# Waits for the Google Sheet connection, starting it if necessary
+def get_sheet():
+    global sheet_connection, sheet_error
+    start_sheet_connection()
+    sheet_connection.join()
+    if sheet_error is not None:
+        # Allow the next call to try connecting again
+        error = sheet_error
+        sheet_connection = None
+        sheet_error = None
+        raise error
+    return SHEET
@@ -0,0 +1,108 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+
+# Keeps the optimal route length and routes of recently solved hands, so
+# that solving the same hand again returns instantly. Holds at most max_size
+# hands, dropping the least recently used first. With ttl (seconds), hands
+# are also dropped once they are older than ttl. With path, the cache is
+# read from and written back to a JSON file, which is ignored if it was
+# written for a different board (board_hash)
+class SolutionCache:
+
+    def __init__(self, max_size=1024, ttl=None, path=None, board_hash=""):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.path = path
+        self.board_hash = board_hash
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        if path is not None:
+            self.load()
+
+    # Order of Entry/Exit Cards matters, order of Town Cards does not
+    @staticmethod
+    def hand_key(entry_pair, town_cards):
+        entry_key = "-".join(str(int(card)) for card in entry_pair)
+        town_key = ",".join(str(card) for card in sorted(
+            int(card) for card in town_cards))
+        return f"{entry_key}:{town_key}"
+
+    # Returns (min_length, routes) for the hand, or None if not cached. The
+    # best routes for swapped Entry/Exit Cards are the same routes reversed,
+    # so a hand is also found if it was cached with its Entry/Exit swapped
+    def get(self, entry_pair, town_cards):
+        with self.lock:
+            entry = self.lookup(self.hand_key(entry_pair, town_cards))
+            reverse = False
+            if entry is None:
+                entry = self.lookup(
+                    self.hand_key(entry_pair[::-1], town_cards))
+                reverse = True
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        stored_at, min_length, routes = entry
+        if reverse:
+            routes = sorted(route[::-1] for route in routes)
+        return min_length, np.array(routes)
+
+    # Must be called while holding lock
+    def lookup(self, key):
+        entry = self.entries.get(key)
+        if entry is not None and self.expired(entry):
+            del self.entries[key]
+            return None
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def put(self, entry_pair, town_cards, min_length, routes):
+        key = self.hand_key(entry_pair, town_cards)
+        routes = np.asarray(routes).tolist()
+        with self.lock:
+            self.entries[key] = (time.time(), int(min_length), routes)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        if self.path is not None:
+            self.save()
+
+    def expired(self, entry):
+        return self.ttl is not None and time.time() - entry[0] > self.ttl
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses,
+                "size": len(self.entries)}
+
+    def load(self):
+        try:
+            with open(self.path, "r") as file:
+                saved = json.load(file)
+        except (OSError, ValueError):
+            return
+        if saved.get("board_hash") != self.board_hash:
+            return
+        with self.lock:
+            for key, entry in saved["entries"]:
+                self.entries[key] = tuple(entry)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    # Written to a temporary file first, so a partly written cache is never
+    # read back
+    def save(self):
+        with self.lock:
+            saved = {"board_hash": self.board_hash,
+                     "entries": list(self.entries.items())}
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "w") as file:
+            json.dump(saved, file)
+        os.replace(temporary_path, self.path)
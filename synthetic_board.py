@@ -0,0 +1,30 @@
+import numpy as np
+
+
+# Randomly generated boards shaped like the Discovering Ireland board, for
+# benchmarking and testing without the Google Sheet. The same seed always
+# gives the same board
+
+
+# Number of towns on the Discovering Ireland board
+NUMBER_OF_TOWNS = 52
+
+
+# Random board with each town linked to its nearest few towns, with edge
+# weights from 1 to 4 like counted_distances
+def synthetic_edge_weights(seed, number_of_towns=NUMBER_OF_TOWNS, links=3):
+    rng = np.random.default_rng(seed)
+    points = rng.random((number_of_towns, 2))
+    gaps = np.linalg.norm(points[:, np.newaxis] - points, axis=2)
+    edge_weights_matrix = np.zeros((number_of_towns, number_of_towns),
+                                   dtype=np.int32)
+    for town in range(number_of_towns):
+        # A chain through every town keeps the board connected
+        nearest = list(np.argsort(gaps[town])[1:links + 1])
+        if town > 0:
+            nearest.append(town - 1)
+        for other in nearest:
+            weight = rng.integers(1, 5)
+            edge_weights_matrix[town, other] = weight
+            edge_weights_matrix[other, town] = weight
+    return edge_weights_matrix
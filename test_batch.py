@@ -0,0 +1,89 @@
+import json
+import pytest
+import batch
+import board_cache
+import route_solver
+from synthetic_board import NUMBER_OF_TOWNS, synthetic_edge_weights
+
+
+# Checks reading hands and solving them without prompts, e.g.
+#   python3 -m pytest test_batch.py
+
+
+def write_board_cache(cache_dir):
+    edge_weights_matrix = synthetic_edge_weights(0)
+    distances, predecessors = route_solver.all_pairs_shortest_paths(
+        edge_weights_matrix)
+    board_cache.save_board_cache({
+        "source_hash": "synthetic",
+        "edge_weights_matrix": edge_weights_matrix,
+        "distances": distances,
+        "predecessors": predecessors,
+        "town_names": [f"Town{card}"
+                       for card in range(1, NUMBER_OF_TOWNS + 1)],
+    }, cache_dir)
+
+
+def test_read_jsonl_hands(tmp_path):
+    path = tmp_path / "hands.jsonl"
+    path.write_text(
+        '{"id": "a", "entry_cards": [5, 47], "town_cards": [3, 9]}\n'
+        '\n'
+        'not json\n'
+        '[5, 47]\n'
+        '{"entry_cards": [5, 47], "town_cards": [3]}\n')
+    assert list(batch.read_hands(str(path))) == [
+        {"id": "a", "entry_cards": [5, 47], "town_cards": [3, 9]},
+        {"id": 3, "error": "Line is not valid JSON."},
+        {"id": 4, "error": "Line must be a JSON object."},
+        {"id": 5, "entry_cards": [5, 47], "town_cards": [3]},
+    ]
+
+
+def test_read_csv_hands(tmp_path):
+    path = tmp_path / "hands.csv"
+    path.write_text("entry_cards,town_cards\n5 47,3 9\n5 47\n")
+    assert list(batch.read_hands(str(path))) == [
+        {"id": 1, "entry_cards": ["5", "47"], "town_cards": ["3", "9"]},
+        {"id": 2, "entry_cards": ["5", "47"], "town_cards": []},
+    ]
+
+
+def test_csv_without_card_columns_exits(tmp_path):
+    path = tmp_path / "hands.csv"
+    path.write_text("id,entry_cards\n1,5 47\n")
+    with pytest.raises(SystemExit, match="town_cards"):
+        list(batch.read_hands(str(path)))
+
+
+def test_bad_hands_give_errors(tmp_path):
+    write_board_cache(tmp_path)
+    batch.init_worker(tmp_path)
+    assert batch.solve_hand({"id": 3, "error": "Line is not valid JSON."},
+                            "held-karp", None) == {
+        "id": 3, "error": "Line is not valid JSON."}
+    assert "error" in batch.solve_hand(
+        {"id": 1, "entry_cards": [5, 47], "town_cards": ["x"]},
+        "held-karp", None)
+    assert "error" in batch.solve_hand(
+        {"id": 1, "entry_cards": [5, 47], "town_cards": []},
+        "held-karp", None)
+
+
+def test_main_writes_a_result_for_every_hand(tmp_path):
+    write_board_cache(tmp_path / "board_cache")
+    hands = tmp_path / "hands.jsonl"
+    hands.write_text(
+        '{"entry_cards": [5, 47], "town_cards": [3, 12, 20]}\n'
+        'not json\n')
+    results = tmp_path / "results.jsonl"
+    batch.main([str(hands), str(results), "--workers", "1",
+                "--board-cache", str(tmp_path / "board_cache")])
+
+    solved, failed = [json.loads(line)
+                      for line in results.read_text().splitlines()]
+    board = board_cache.solver_board(
+        board_cache.load_board_cache(tmp_path / "board_cache"))
+    assert solved["length"] == board.solve([5, 47], [3, 12, 20]).length
+    assert solved["proven_optimal"]
+    assert failed == {"id": 2, "error": "Line is not valid JSON."}
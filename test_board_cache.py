@@ -0,0 +1,71 @@
+import numpy as np
+import board_cache
+from synthetic_board import NUMBER_OF_TOWNS, synthetic_edge_weights
+
+
+# Checks the board is only read from the sheet when it has to be, e.g.
+#   python3 -m pytest test_board_cache.py
+
+
+# Stands in for the Google Sheet, counting how many times it is read
+class FakeSheet:
+
+    def __init__(self, seed=0):
+        self.counted_distances = [
+            [str(weight) for weight in row]
+            for row in synthetic_edge_weights(seed).tolist()]
+        self.town_names = [[f"Town{card}"]
+                           for card in range(1, NUMBER_OF_TOWNS + 1)]
+        self.reads = 0
+
+    def worksheet(self, name):
+        self.reads += 1
+        values = (self.counted_distances if name == "counted_distances"
+                  else self.town_names)
+        return FakeWorksheet(values)
+
+
+class FakeWorksheet:
+
+    def __init__(self, values):
+        self.values = values
+
+    def get_all_values(self):
+        return self.values
+
+
+def test_board_is_cached(tmp_path):
+    sheet = FakeSheet()
+    board, source = board_cache.load_board(lambda: sheet, cache_dir=tmp_path)
+    assert source == "Google Sheets"
+    assert sheet.reads == 2
+
+    cached_board, source = board_cache.load_board(
+        lambda: sheet, cache_dir=tmp_path)
+    assert source == "cache"
+    assert sheet.reads == 2
+    assert np.array_equal(cached_board.distances, board.distances)
+    assert np.array_equal(cached_board.predecessors, board.predecessors)
+    assert cached_board.town_names == board.town_names
+    assert cached_board.source_hash == board.source_hash
+
+
+def test_refresh_rebuilds_only_when_sheet_changes(tmp_path):
+    board, _ = board_cache.load_board(lambda: FakeSheet(), cache_dir=tmp_path)
+
+    board_cache.load_board(lambda: FakeSheet(), refresh=True,
+                           cache_dir=tmp_path)
+    assert board_cache.load_board_cache(tmp_path)["source_hash"] == (
+        board.source_hash)
+
+    changed_board, _ = board_cache.load_board(
+        lambda: FakeSheet(seed=1), refresh=True, cache_dir=tmp_path)
+    assert changed_board.source_hash != board.source_hash
+    assert board_cache.load_board_cache(tmp_path)["source_hash"] == (
+        changed_board.source_hash)
+
+
+def test_incomplete_cache_is_not_used(tmp_path):
+    board_cache.load_board(lambda: FakeSheet(), cache_dir=tmp_path)
+    (tmp_path / "distances.npy").unlink()
+    assert board_cache.load_board_cache(tmp_path) is None
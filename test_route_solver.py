@@ -0,0 +1,384 @@
+import itertools
+import random
+import numpy as np
+import pytest
+import route_solver
+from solution_cache import SolutionCache
+from synthetic_board import NUMBER_OF_TOWNS, synthetic_edge_weights
+
+
+# Checks the solvers against brute force on a synthetic board, e.g.
+#   python3 -m pytest test_route_solver.py
+
+
+board = route_solver.Board.from_edge_weights(
+    synthetic_edge_weights(0),
+    [f"Town{card}" for card in range(1, NUMBER_OF_TOWNS + 1)])
+
+
+# A few hands of each size, including hands where both Entry/Exit Cards are
+# the same
+def sample_hands(sizes, per_size, seed=0):
+    rng = random.Random(seed)
+    hands = []
+    for number_of_towns in sizes:
+        for _ in range(per_size):
+            entry_pair = rng.sample(board.entry_cards, 2)
+            hands.append((entry_pair, sorted(
+                rng.sample(board.town_cards, number_of_towns))))
+        entry_card = rng.choice(board.entry_cards)
+        hands.append(([entry_card, entry_card], sorted(
+            rng.sample(board.town_cards, number_of_towns))))
+    return hands
+
+
+HANDS = sample_hands(range(1, 8), 2)
+
+
+# Length of every route through the hand, in itertools.permutations order
+def brute_force(entry_pair, town_cards):
+    routes = []
+    for ordering in itertools.permutations(town_cards):
+        route = [entry_pair[0], *ordering, entry_pair[1]]
+        length = sum(int(board.distances[a - 1, b - 1])
+                     for a, b in zip(route, route[1:]))
+        routes.append((length, tuple(route)))
+    return routes
+
+
+# Optimal length and the set of every optimal route
+def optimal(entry_pair, town_cards):
+    routes = brute_force(entry_pair, town_cards)
+    min_length = min(length for length, _ in routes)
+    return min_length, {route for length, route in routes
+                        if length == min_length}
+
+
+def route_set(routes):
+    return {tuple(int(card) for card in route) for route in routes}
+
+
+@pytest.mark.parametrize("entry_pair, town_cards", HANDS)
+def test_held_karp_matches_brute_force(entry_pair, town_cards):
+    min_length, routes, proven_optimal = route_solver.held_karp_routes(
+        board.distances, entry_pair, town_cards)
+    assert proven_optimal
+    assert (min_length, route_set(routes)) == optimal(entry_pair, town_cards)
+
+
+def test_held_karp_without_town_cards():
+    min_length, routes, _ = route_solver.held_karp_routes(
+        board.distances, [5, 47], [])
+    assert min_length == board.distances[4, 46]
+    assert route_set(routes) == {(5, 47)}
+
+
+def test_board_rejects_invalid_hands():
+    with pytest.raises(ValueError):
+        board.solve([5, 47], [])
+    with pytest.raises(ValueError):
+        board.solve([5, 47], [3, 3])
+    with pytest.raises(ValueError):
+        board.solve([5, 47], [9])
+
+
+@pytest.mark.parametrize("entry_pair, town_cards", HANDS)
+def test_branch_and_bound_matches_brute_force(entry_pair, town_cards):
+    min_length, routes, proven_optimal = route_solver.branch_and_bound_routes(
+        board.distances, entry_pair, town_cards)
+    assert proven_optimal
+    assert (min_length, route_set(routes)) == optimal(entry_pair, town_cards)
+
+
+# Out of time straight away, so the best route found so far (at least the
+# nearest neighbour route) is returned, and each improvement was reported
+def test_branch_and_bound_anytime():
+    entry_pair, town_cards = [5, 47], board.town_cards[:20]
+    improvements = []
+    min_length, routes, proven_optimal = route_solver.branch_and_bound_routes(
+        board.distances, entry_pair, town_cards, time_limit=0,
+        on_improvement=lambda length, route: improvements.append(length))
+    assert not proven_optimal
+    assert improvements[-1] == min_length
+    assert improvements == sorted(improvements, reverse=True)
+    for route in routes:
+        assert sorted(route[1:-1]) == sorted(town_cards)
+
+
+@pytest.mark.parametrize("entry_pair, town_cards", HANDS)
+def test_permutations_match_brute_force(entry_pair, town_cards):
+    min_length, routes, proven_optimal = route_solver.permutation_routes(
+        board.distances, entry_pair, town_cards)
+    assert proven_optimal
+    assert (min_length, route_set(routes)) == optimal(entry_pair, town_cards)
+
+
+def test_score_orderings_matches_brute_force():
+    entry_pair, town_cards = [9, 31], board.town_cards[10:15]
+    hand_matrix = route_solver.hand_distances(
+        board.distances, entry_pair, town_cards)
+    orderings = np.array(list(itertools.permutations(range(5))))
+    lengths = route_solver.score_orderings(hand_matrix, orderings)
+    assert lengths.tolist() == [
+        length for length, _ in brute_force(entry_pair, town_cards)]
+
+
+# Chunks smaller than the number of orderings, including one which does
+# not divide it, give the same result as scoring everything at once
+@pytest.mark.parametrize("chunk_size", [1, 7, 100])
+def test_permutation_chunks_match_brute_force(chunk_size):
+    for entry_pair, town_cards in sample_hands([5], 1, seed=1):
+        min_length, routes, _ = route_solver.permutation_routes(
+            board.distances, entry_pair, town_cards, chunk_size=chunk_size)
+        assert (min_length, route_set(routes)) == optimal(
+            entry_pair, town_cards)
+
+
+def test_permutation_chunks_cover_every_ordering():
+    chunks = list(route_solver.permutation_chunks(5, chunk_size=7))
+    assert max(len(chunk) for chunk in chunks) <= 7
+    orderings = [tuple(ordering) for chunk in chunks for ordering in chunk]
+    assert orderings == list(itertools.permutations(range(5)))
+
+
+@pytest.mark.parametrize("entry_pair, town_cards", sample_hands([4, 7], 1))
+def test_parallel_permutations_match_brute_force(entry_pair, town_cards):
+    profile = route_solver.SolveProfile()
+    min_length, routes, _ = route_solver.permutation_routes(
+        board.distances, entry_pair, town_cards, chunk_size=100, workers=2,
+        profile=profile)
+    assert (min_length, route_set(routes)) == optimal(entry_pair, town_cards)
+    # Counters recorded in the worker processes are merged back
+    assert profile.counters["orderings scored"] > 0
+
+
+# Shortest distances from one town by Dijkstra's algorithm, following links
+# in both directions
+def reference_distances(edge_weights_matrix, start):
+    number_of_towns = len(edge_weights_matrix)
+    distances = [None] * number_of_towns
+    queue = [(0, start)]
+    while queue:
+        queue.sort()
+        distance, town = queue.pop(0)
+        if distances[town] is not None:
+            continue
+        distances[town] = distance
+        for other in range(number_of_towns):
+            weight = max(edge_weights_matrix[town, other],
+                         edge_weights_matrix[other, town])
+            if weight > 0 and distances[other] is None:
+                queue.append((distance + int(weight), other))
+    return distances
+
+
+def test_distances_match_dijkstra():
+    edge_weights_matrix = synthetic_edge_weights(0)
+    for town in range(NUMBER_OF_TOWNS):
+        assert board.distances[town].tolist() == reference_distances(
+            edge_weights_matrix, town)
+
+
+def test_link_in_one_direction_is_used_both_ways():
+    edge_weights_matrix = np.zeros((3, 3), dtype=np.int32)
+    edge_weights_matrix[0, 1] = 2
+    edge_weights_matrix[2, 1] = 3
+    distances, _ = route_solver.all_pairs_shortest_paths(edge_weights_matrix)
+    assert distances.tolist() == [[0, 2, 5], [2, 0, 3], [5, 3, 0]]
+
+
+def test_asymmetric_weights_are_rejected():
+    edge_weights_matrix = np.zeros((3, 3), dtype=np.int32)
+    edge_weights_matrix[0, 1] = 2
+    edge_weights_matrix[1, 0] = 3
+    with pytest.raises(ValueError):
+        route_solver.all_pairs_shortest_paths(edge_weights_matrix)
+    distances = np.array([[0, 2], [3, 0]])
+    with pytest.raises(ValueError):
+        route_solver.Board(distances, np.zeros((2, 2), dtype=np.int8),
+                           ["Town1", "Town2"])
+
+
+SAME_ENTRY_HANDS = [(entry_pair, town_cards) for entry_pair, town_cards
+                    in sample_hands(range(2, 8), 1, seed=2)
+                    if entry_pair[0] == entry_pair[1]]
+
+
+# Searching only half the orderings when both Entry/Exit Cards are the same
+# still finds every optimal route, each in both directions
+@pytest.mark.parametrize("method", route_solver.SOLVERS)
+@pytest.mark.parametrize("entry_pair, town_cards", SAME_ENTRY_HANDS)
+def test_same_entry_hands_match_brute_force(method, entry_pair, town_cards):
+    min_length, routes, _ = route_solver.find_optimal_routes(
+        board.distances, entry_pair, town_cards, method=method)
+    routes = route_set(routes)
+    assert (min_length, routes) == optimal(entry_pair, town_cards)
+    assert routes == {route[::-1] for route in routes}
+
+
+def test_is_symmetric_hand():
+    town_cards = board.town_cards[:4]
+    hand_matrix = route_solver.hand_distances(
+        board.distances, [5, 5], town_cards)
+    assert route_solver.is_symmetric_hand(hand_matrix, [5, 5])
+    assert not route_solver.is_symmetric_hand(hand_matrix, [5, 47])
+    hand_matrix[0, 1] += 1
+    assert not route_solver.is_symmetric_hand(hand_matrix, [5, 5])
+
+
+def test_canonical_orderings_with_mirrors_are_every_ordering():
+    chunks = route_solver.permutation_chunks(5, chunk_size=7, canonical=True)
+    orderings = [ordering for chunk in chunks for ordering in chunk]
+    assert len(orderings) == 60
+    assert route_solver.with_mirrored_orderings(orderings) == list(
+        itertools.permutations(range(5)))
+
+
+def test_remove_duplicate_routes_keeps_first_of_each():
+    routes = [[5, 1, 2, 47], [5, 2, 1, 47], [5, 1, 2, 47]]
+    assert route_solver.remove_duplicate_routes(routes) == routes[:2]
+
+
+def test_remove_symmetrical_routes_only_for_same_entry_cards():
+    routes = [[5, 1, 2, 5], [5, 2, 1, 5], [5, 1, 3, 5]]
+    assert route_solver.remove_symmetrical_routes(routes, [5, 5]) == [
+        [5, 1, 2, 5], [5, 1, 3, 5]]
+    assert route_solver.remove_symmetrical_routes(routes, [5, 47]) == routes
+
+
+@pytest.mark.parametrize("entry_pair, town_cards", HANDS)
+def test_near_optimal_slack_matches_brute_force(entry_pair, town_cards):
+    routes = brute_force(entry_pair, town_cards)
+    min_length = min(length for length, _ in routes)
+    within = sorted((length, route) for length, route in routes
+                    if length <= min_length + 2)
+
+    lengths, found, proven_optimal = route_solver.near_optimal_routes(
+        board.distances, entry_pair, town_cards, slack=2)
+    assert proven_optimal
+    assert lengths == [length for length, _ in within]
+    assert route_set(found) == {route for _, route in within}
+
+
+# With different Entry/Exit Cards, the k shortest routes are the first k
+# lengths of all routes sorted by length
+@pytest.mark.parametrize("entry_pair, town_cards",
+                         [hand for hand in HANDS if hand[0][0] != hand[0][1]])
+def test_near_optimal_k_matches_brute_force(entry_pair, town_cards):
+    lengths = sorted(length for length, _ in
+                     brute_force(entry_pair, town_cards))
+    found, _, _ = route_solver.near_optimal_routes(
+        board.distances, entry_pair, town_cards, k=3)
+    assert found == lengths[:3]
+
+    longer = [length for length in lengths if length > lengths[0]]
+    found, _, _ = route_solver.near_optimal_routes(
+        board.distances, entry_pair, town_cards, k=3, longer_than=lengths[0])
+    assert found == longer[:3]
+
+
+@pytest.mark.parametrize("options", [{}, {"k": 0}, {"slack": -1}])
+def test_near_optimal_rejects_bad_options(options):
+    with pytest.raises(ValueError):
+        route_solver.near_optimal_routes(
+            board.distances, [5, 47], [3, 12], **options)
+
+
+# Each Solution visits a different set of towns, shortest first
+def test_board_near_optimal_gives_different_routes():
+    solutions = board.near_optimal([5, 47], [3, 12, 20, 25], k=4)
+    assert len(solutions) == 4
+    assert solutions[0].length == board.solve([5, 47], [3, 12, 20, 25]).length
+    lengths = [solution.length for solution in solutions]
+    assert lengths == sorted(lengths)
+    towns_visited = [tuple(solution.towns_visited[0])
+                     for solution in solutions]
+    assert len(set(towns_visited)) == 4
+
+
+# Two hands heavy enough for the process pool, two solved in this process
+TABLE = [([5, 47], board.town_cards[:12]), ([9, 9], board.town_cards[20:32]),
+         ([31, 50], [3, 12, 20]), ([39, 5], [25])]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_solve_table_matches_solve(workers):
+    cache = SolutionCache()
+    solutions = board.solve_table(TABLE, method="branch-and-bound",
+                                  workers=workers, cache=cache)
+    for (entry_pair, town_cards), solution in zip(TABLE, solutions):
+        expected = board.solve(entry_pair, town_cards,
+                               method="branch-and-bound")
+        assert solution.entry_cards == entry_pair
+        assert solution.length == expected.length
+        assert solution.towns_visited == expected.towns_visited
+    # Each hand is looked up once, then added once solved
+    assert cache.stats() == {"hits": 0, "misses": 4, "size": 4}
+
+    board.solve_table(TABLE, method="branch-and-bound", workers=workers,
+                      cache=cache)
+    assert cache.stats()["hits"] == 4
+
+
+def test_solve_table_names_the_bad_hand():
+    with pytest.raises(ValueError, match="Player 2"):
+        board.solve_table([([5, 47], [3]), ([5, 47], [9])])
+
+
+# Towns along the shortest path from one town to another (indices), walking
+# back from the end through the predecessor matrix
+def reference_path(start, end):
+    path = [end]
+    while path[-1] != start:
+        path.append(int(board.predecessors[start, path[-1]]))
+    return path[::-1]
+
+
+def test_path_tables_match_predecessor_walk():
+    next_hops, hop_counts = route_solver.path_tables(board.predecessors)
+    assert next_hops.dtype == hop_counts.dtype == np.int8
+    for start in range(NUMBER_OF_TOWNS):
+        for end in range(NUMBER_OF_TOWNS):
+            path = reference_path(start, end)
+            assert hop_counts[start, end] == len(path) - 1
+            assert next_hops[start, end] == (
+                -1 if start == end else path[1])
+
+
+# Shortest paths between consecutive cards of each route, joined together
+def test_expand_routes_matches_predecessor_walk():
+    routes = [[5, 3, 12, 47], [9, 12, 3, 9], [31, 20, 31, 31]]
+    expected = []
+    for route in routes:
+        towns = [route[0]]
+        for start, end in zip(route, route[1:]):
+            towns += [town + 1 for town in reference_path(start - 1,
+                                                          end - 1)[1:]]
+        expected.append(towns)
+    assert board.expand_routes(routes) == expected
+    assert route_solver.expand_routes(board.predecessors, routes) == expected
+
+    towns, lengths = route_solver.expand_routes_array(
+        board.next_hops, board.hop_counts, routes)
+    assert lengths.tolist() == [len(towns) for towns in expected]
+    for row, length in zip(towns, lengths):
+        assert not row[length:].any()
+
+
+# Every town visited has a path the same length as the shortest distance
+def test_expanded_routes_are_shortest():
+    entry_pair, town_cards = [5, 47], [3, 12, 20, 25]
+    solution = board.solve(entry_pair, town_cards)
+    edge_weights_matrix = synthetic_edge_weights(0)
+    for towns in solution.towns_visited:
+        length = sum(max(edge_weights_matrix[a - 1, b - 1],
+                         edge_weights_matrix[b - 1, a - 1])
+                     for a, b in zip(towns, towns[1:]))
+        assert length == solution.length
+
+
+def test_expand_no_routes():
+    towns, lengths = route_solver.expand_routes_array(
+        board.next_hops, board.hop_counts, [])
+    assert towns.shape == (0, 1)
+    assert len(lengths) == 0
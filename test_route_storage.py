@@ -0,0 +1,80 @@
+import pytest
+import route_storage
+
+
+# Checks saving and loading routes, e.g.
+#   python3 -m pytest test_route_storage.py
+
+
+DEALT_HAND = [5, 47, 3, 9, 12]
+ROUTES = [["Town5", "Town3", "Town9", "Town12", "Town47"],
+          ["Town5", "Town12", "Town47"]]
+
+
+def test_saved_routes_values_are_padded_columns():
+    values = route_storage.saved_routes_values(DEALT_HAND, ROUTES)
+    assert values[0] == ["Dealt Hand", "Route 1", "Route 2"]
+    assert [row[0] for row in values[1:]] == ["5", "47", "3", "9", "12"]
+    assert [row[2] for row in values] == [
+        "Route 2", "Town5", "Town12", "Town47", "", ""]
+
+
+# Google Sheets leaves out empty cells at the end of each row
+def trim_rows(values):
+    trimmed = []
+    for row in values:
+        row = list(row)
+        while row and row[-1] == "":
+            row.pop()
+        trimmed.append(row)
+    return trimmed
+
+
+@pytest.mark.parametrize("trim", [False, True])
+def test_saved_routes_round_trip(trim):
+    values = route_storage.saved_routes_values(DEALT_HAND, ROUTES)
+    if trim:
+        values = trim_rows(values)
+    entry_cards, town_cards, routes = route_storage.parse_saved_routes(values)
+    assert entry_cards == (5, 47)
+    assert town_cards == (3, 9, 12)
+    assert routes == tuple(tuple(route) for route in ROUTES)
+
+
+# A longer second route leaves the dealt hand column padded instead
+def test_saved_routes_round_trip_with_short_dealt_hand():
+    routes = [["Town5", "Town3", "Town47"],
+              ["Town5", "Town1", "Town2", "Town4", "Town3", "Town47"]]
+    values = trim_rows(route_storage.saved_routes_values([5, 47, 3], routes))
+    assert route_storage.parse_saved_routes(values) == (
+        (5, 47), (3,), tuple(tuple(route) for route in routes))
+
+
+def test_sqlite_round_trip():
+    storage = route_storage.SQLiteStorage(":memory:")
+    storage.save("game", DEALT_HAND, ROUTES)
+    assert storage.load("game") == (
+        (5, 47), (3, 9, 12), tuple(tuple(route) for route in ROUTES))
+
+
+def test_sqlite_save_name_taken():
+    storage = route_storage.SQLiteStorage(":memory:")
+    storage.save("game", DEALT_HAND, ROUTES)
+    with pytest.raises(route_storage.SaveNameTaken):
+        storage.save("game", DEALT_HAND, ROUTES[:1])
+    assert len(storage.load("game")[2]) == 2
+
+
+def test_sqlite_save_not_found():
+    storage = route_storage.SQLiteStorage(":memory:")
+    with pytest.raises(route_storage.SaveNotFound):
+        storage.load("game")
+
+
+def test_sheets_connection_failure_is_storage_error():
+    def get_sheet():
+        raise OSError("no network")
+
+    storage = route_storage.SheetsStorage(get_sheet)
+    with pytest.raises(route_storage.StorageError):
+        storage.sheet()
@@ -0,0 +1,44 @@
+import run
+import route_solver
+from synthetic_board import NUMBER_OF_TOWNS, synthetic_edge_weights
+
+
+# Checks the output of the terminal program, e.g.
+#   python3 -m pytest test_run.py
+
+
+def use_synthetic_board(monkeypatch):
+    monkeypatch.setattr(run, "board", route_solver.Board.from_edge_weights(
+        synthetic_edge_weights(0),
+        [f"Town{card}" for card in range(1, NUMBER_OF_TOWNS + 1)]))
+
+
+def test_render_routes_without_colour(monkeypatch):
+    use_synthetic_board(monkeypatch)
+    output = run.render_routes([[5, 3, 8, 3, 47], [5, 47]], [3],
+                               lengths=[7, 4], colour=False)
+    assert output == (
+        "\n\n     Route 1 (length 7)  \n\n"
+        "     5 : Town5\n"
+        "     3 : Town3\n"
+        "     8 : Town8\n"
+        "     3 : Town3\n"
+        "    47 : Town47\n"
+        "\n\n     Route 2 (length 4)  \n\n"
+        "     5 : Town5\n"
+        "    47 : Town47\n")
+    assert "\x1b" not in output
+
+
+# Entry/Exit Cards and the first visit to each relevant town are coloured
+def test_render_routes_with_colour(monkeypatch):
+    use_synthetic_board(monkeypatch)
+    output = run.render_routes([[5, 3, 8, 3, 47]], [3], colour=True)
+    lines = output.strip("\n").split("\n")
+    assert "Route 1 " in lines[0]
+    town_lines = lines[2:]
+    assert town_lines[0].startswith(run.Fore.YELLOW)
+    assert town_lines[1].startswith(run.Fore.GREEN)
+    assert town_lines[2] == "     8 : Town8"
+    assert town_lines[3] == "     3 : Town3"
+    assert town_lines[4].startswith(run.Fore.YELLOW)
@@ -0,0 +1,111 @@
+import asyncio
+import json
+from http import HTTPStatus
+import pytest
+import batch
+import board_cache
+import server
+from test_batch import write_board_cache
+
+
+# Checks reading requests and hands for the HTTP solve service, e.g.
+#   python3 -m pytest test_server.py
+
+
+def hand_body(**hand):
+    return json.dumps({"entry_cards": [5, 47], "town_cards": [3, 12, 20],
+                       **hand})
+
+
+def test_parse_hand_defaults():
+    hand, method, time_limit = server.parse_hand(hand_body())
+    assert hand["id"] is None
+    assert method == "held-karp"
+    assert time_limit == server.MAX_TIME_LIMIT
+
+
+def test_time_limit_is_capped():
+    _, _, time_limit = server.parse_hand(
+        hand_body(time_limit=server.MAX_TIME_LIMIT * 2))
+    assert time_limit == server.MAX_TIME_LIMIT
+
+
+# Too many Town Cards for permutations to solve in time
+def test_large_hands_use_an_anytime_solver():
+    _, method, _ = server.parse_hand(hand_body(
+        method="permutations", town_cards=list(range(10, 30))))
+    assert method == "branch-and-bound"
+
+
+@pytest.mark.parametrize("body", [
+    "not json",
+    "[5, 47]",
+    hand_body(town_cards=3),
+    hand_body(entry_cards="5 47"),
+    hand_body(method="simulated-annealing"),
+    hand_body(method=["held-karp"]),
+    hand_body(time_limit=True),
+    hand_body(time_limit="5"),
+    hand_body(time_limit=0),
+    '{"entry_cards": [5, 47], "town_cards": [3], "time_limit": NaN}',
+    '{"entry_cards": [5, 47], "town_cards": [3], "time_limit": Infinity}',
+])
+def test_bad_hands_are_rejected(body):
+    with pytest.raises(server.RequestError) as error:
+        server.parse_hand(body)
+    assert error.value.status == HTTPStatus.BAD_REQUEST
+
+
+async def read(request):
+    reader = asyncio.StreamReader()
+    reader.feed_data(request)
+    reader.feed_eof()
+    return await server.read_request(reader)
+
+
+def test_read_request():
+    body = hand_body().encode("utf-8")
+    method, path, read_body, keep_alive = asyncio.run(read(
+        b"POST /solve?x=1 HTTP/1.1\r\n"
+        b"Content-Length: " + str(len(body)).encode("latin-1") + b"\r\n"
+        b"\r\n" + body))
+    assert (method, path, read_body, keep_alive) == (
+        "POST", "/solve", body, True)
+
+
+def test_connection_close_is_not_kept_alive():
+    request = asyncio.run(read(
+        b"GET /solve HTTP/1.1\r\nConnection: close\r\n\r\n"))
+    assert request == ("GET", "/solve", b"", False)
+
+
+@pytest.mark.parametrize("request_bytes, status", [
+    (b"POST /solve\r\n\r\n", HTTPStatus.BAD_REQUEST),
+    (b"POST /solve HTTP/1.1\r\nContent-Length: ten\r\n\r\n",
+     HTTPStatus.BAD_REQUEST),
+    (b"POST /solve HTTP/1.1\r\nContent-Length: -1\r\n\r\n",
+     HTTPStatus.BAD_REQUEST),
+    (b"POST /solve HTTP/1.1\r\nContent-Length: 1000000\r\n\r\n",
+     HTTPStatus.REQUEST_ENTITY_TOO_LARGE),
+])
+def test_bad_requests_are_rejected(request_bytes, status):
+    with pytest.raises(server.RequestError) as error:
+        asyncio.run(read(request_bytes))
+    assert error.value.status == status
+
+
+def test_light_hand_is_solved(tmp_path):
+    write_board_cache(tmp_path)
+    batch.init_worker(tmp_path)
+    result = asyncio.run(server.handle_request("POST", "/solve", hand_body()))
+    board = board_cache.solver_board(board_cache.load_board_cache(tmp_path))
+    assert result["method"] == "held-karp"
+    assert result["length"] == board.solve([5, 47], [3, 12, 20]).length
+
+    with pytest.raises(server.RequestError) as error:
+        asyncio.run(server.handle_request(
+            "POST", "/solve", hand_body(town_cards=[5])))
+    assert error.value.status == HTTPStatus.BAD_REQUEST
+    with pytest.raises(server.RequestError) as error:
+        asyncio.run(server.handle_request("POST", "/other", hand_body()))
+    assert error.value.status == HTTPStatus.NOT_FOUND
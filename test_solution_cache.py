@@ -0,0 +1,83 @@
+import json
+import numpy as np
+from solution_cache import SolutionCache
+
+
+# Checks the solution cache, e.g.
+#   python3 -m pytest test_solution_cache.py
+
+
+ROUTES = [[5, 3, 9, 47], [5, 9, 3, 47]]
+
+
+def test_order_of_town_cards_does_not_matter():
+    cache = SolutionCache()
+    cache.put([5, 47], [9, 3], 12, ROUTES)
+    min_length, routes = cache.get([5, 47], [3, 9])
+    assert min_length == 12
+    assert routes.tolist() == ROUTES
+    assert cache.stats() == {"hits": 1, "misses": 0, "size": 1}
+
+
+def test_swapped_entry_cards_give_reversed_routes():
+    cache = SolutionCache()
+    cache.put([5, 47], [3, 9], 12, ROUTES)
+    min_length, routes = cache.get([47, 5], [3, 9])
+    assert min_length == 12
+    assert routes.tolist() == [[47, 3, 9, 5], [47, 9, 3, 5]]
+
+
+def test_missing_hand():
+    cache = SolutionCache()
+    cache.put([5, 47], [3, 9], 12, ROUTES)
+    assert cache.get([5, 47], [3, 10]) is None
+    assert cache.get([5, 48], [3, 9]) is None
+    assert cache.stats() == {"hits": 0, "misses": 2, "size": 1}
+
+
+def test_least_recently_used_is_dropped():
+    cache = SolutionCache(max_size=2)
+    cache.put([5, 47], [1], 1, [[5, 1, 47]])
+    cache.put([5, 47], [2], 2, [[5, 2, 47]])
+    # Using the first hand makes the second the least recently used
+    assert cache.get([5, 47], [1]) is not None
+    cache.put([5, 47], [3], 3, [[5, 3, 47]])
+    assert cache.get([5, 47], [2]) is None
+    assert cache.get([5, 47], [1]) is not None
+    assert cache.get([5, 47], [3]) is not None
+
+
+def test_old_hands_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("solution_cache.time.time", lambda: now[0])
+    cache = SolutionCache(ttl=60)
+    cache.put([5, 47], [3, 9], 12, ROUTES)
+    now[0] += 59
+    assert cache.get([5, 47], [3, 9]) is not None
+    now[0] += 2
+    assert cache.get([5, 47], [3, 9]) is None
+    assert cache.stats()["size"] == 0
+
+
+def test_saved_cache_is_loaded_for_the_same_board(tmp_path):
+    path = tmp_path / "cache.json"
+    cache = SolutionCache(path=path, board_hash="board")
+    cache.put([5, 47], [3, 9], 12, ROUTES)
+    assert json.loads(path.read_text())["board_hash"] == "board"
+
+    loaded = SolutionCache(path=path, board_hash="board")
+    min_length, routes = loaded.get([5, 47], [3, 9])
+    assert min_length == 12
+    assert np.array_equal(routes, ROUTES)
+
+    assert SolutionCache(path=path, board_hash="other board").get(
+        [5, 47], [3, 9]) is None
+
+
+def test_unreadable_cache_file_is_ignored(tmp_path):
+    path = tmp_path / "cache.json"
+    path.write_text("not json")
+    cache = SolutionCache(path=path)
+    assert cache.stats()["size"] == 0
+    cache.put([5, 47], [3, 9], 12, ROUTES)
+    assert SolutionCache(path=path).stats()["size"] == 1